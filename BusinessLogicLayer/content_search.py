@@ -0,0 +1,252 @@
+import mmap
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import Event
+
+from BusinessLogicLayer.search_engine import walk
+from CommonLayer import settings
+from CommonLayer.cancel_token import CancelToken, OperationCancelled
+from CommonLayer.file_entry import FileEntry
+
+PREFIXES = ("content:", "grep:")
+SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2, "g": 1024 ** 3, "gb": 1024 ** 3}
+SIZE_FILTER = re.compile(r"^size([<>])(\d+(?:\.\d+)?)([kmg]?b?)$", re.IGNORECASE)
+
+# A NUL byte in the first block marks the file as binary
+SNIFF_BYTES = 8192
+# Large files are matched window by window so a cancel is noticed within one window
+WINDOW_BYTES = 64 * 1024 * 1024
+# Line numbers are worked out for the first few hits only; the rest are just counted
+MAX_LINES = 5
+# Files per pool task, or fewer when they add up to this many bytes
+TASK_FILES = 32
+TASK_BYTES = 64 * 1024 * 1024
+
+# Set by the pool initializer; lets the parent stop a scan that is still running
+_worker_cancel = None
+
+
+def _init_worker(cancel_event):
+    global _worker_cancel
+    _worker_cancel = cancel_event
+
+
+class ContentQuery:
+    __slots__ = ("text", "extensions", "min_size", "max_size")
+
+    def __init__(self, text, extensions=None, min_size=None, max_size=None):
+        self.text = text
+        self.extensions = extensions
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def accepts(self, name, size):
+        if size == 0 or (self.min_size is not None and size <= self.min_size):
+            return False
+        if self.max_size is not None and size >= self.max_size:
+            return False
+        return self.extensions is None or os.path.splitext(name)[1].lower() in self.extensions
+
+
+def parse_query(search_term):
+    # "content: needle ext:py,txt size<10MB" -> ContentQuery; None for a plain file-name search
+    lowered = search_term.lower()
+    prefix = next((prefix for prefix in PREFIXES if lowered.startswith(prefix)), None)
+    if prefix is None:
+        return None
+
+    words = []
+    query = ContentQuery("")
+    for word in search_term[len(prefix):].split():
+        size_filter = SIZE_FILTER.match(word)
+        if word.lower().startswith("ext:"):
+            query.extensions = {"." + ext.lower().lstrip(".") for ext in word[4:].split(",") if ext}
+        elif size_filter:
+            operator, amount, unit = size_filter.groups()
+            limit = int(float(amount) * SIZE_UNITS[unit.lower()])
+            if operator == "<":
+                query.max_size = limit
+            else:
+                query.min_size = limit
+        else:
+            words.append(word)
+    query.text = " ".join(words)
+    return query
+
+
+def count_lines(mapped, start, end, line):
+    # Newlines between two offsets, counted in bounded slices so a huge gap is never copied whole
+    while start < end:
+        stop = min(end, start + WINDOW_BYTES)
+        line += mapped[start:stop].count(b"\n")
+        start = stop
+    return line
+
+
+def scan_file(path, pattern, overlap):
+    # (hits, [line numbers of the first hits]) or None when the file is binary or unreadable
+    with open(path, "rb") as source:
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if b"\0" in mapped[:SNIFF_BYTES]:
+                return None
+            size = len(mapped)
+            hits = 0
+            lines = []
+            line = 1
+            counted = 0
+            start = 0
+            while start < size:
+                if _worker_cancel is not None and _worker_cancel.is_set():
+                    return None
+                end = min(size, start + WINDOW_BYTES)
+                # A match may straddle the window boundary, so the window runs on by `overlap` bytes
+                for match in pattern.finditer(mapped, start, min(size, end + overlap)):
+                    if match.start() >= end:
+                        break
+                    hits += 1
+                    if len(lines) < MAX_LINES:
+                        line = count_lines(mapped, counted, match.start(), line)
+                        counted = match.start()
+                        lines.append(line)
+                start = end
+            return (hits, lines) if hits else None
+
+
+def scan_files(paths, needle, ignore_case):
+    # One pool task: [(path, hits, lines)] for the files that matched
+    pattern = re.compile(re.escape(needle), re.IGNORECASE if ignore_case else 0)
+    matches = []
+    for path in paths:
+        try:
+            result = scan_file(path, pattern, len(needle) - 1)
+        except (OSError, ValueError):
+            continue
+        if result is not None:
+            matches.append((path, result[0], result[1]))
+    return matches
+
+
+class ContentSearchEngine:
+    BATCH_INTERVAL = 0.1
+
+    def __init__(self, post, workers=None):
+        # `post(callback, *args)` must run the callback on the UI thread
+        self.post = post
+        self.workers = workers or os.cpu_count() or 1
+        self.current_token = None
+
+    def search_async(self, root, query, on_batch, on_done, limit=settings.SEARCH_RESULT_CAP):
+        # on_batch(entries, labels, scanned) and on_done(found, hits, scanned, capped) run on the UI thread
+        self.cancel()
+        token = CancelToken()
+        self.current_token = token
+        threading.Thread(target=self._run, args=(root, query, limit, token, on_batch, on_done),
+                         daemon=True).start()
+        return token
+
+    def cancel(self):
+        if self.current_token is not None:
+            self.current_token.cancel()
+            self.current_token = None
+
+    def _run(self, root, query, limit, token, on_batch, on_done):
+        try:
+            found, hits, scanned, capped = self.search(
+                root, query, token, lambda *batch: self.post(self._deliver, token, on_batch, *batch), limit)
+        except OperationCancelled:
+            return
+        self.post(self._deliver, token, on_done, found, hits, scanned, capped)
+
+    def search(self, root, query, token, on_batch, limit=settings.SEARCH_RESULT_CAP):
+        # Blocking form of search_async: on_batch(entries, labels, scanned) runs on this thread
+        if not query.text:
+            return 0, 0, 0, False
+        needle = query.text.encode("utf-8")
+        # Case-insensitive unless the query has capitals; bytes patterns fold ASCII letters only
+        ignore_case = query.text == query.text.lower()
+
+        cancel_event = Event()
+        found = [0, 0]
+        # Set by the first match past the limit; exactly `limit` matches are not a truncated result
+        capped = [False]
+        scanned = 0
+        entries = {}
+        batch, labels = [], {}
+        flushed_at = time.perf_counter()
+
+        def collect(future):
+            for path, hits, lines in future.result():
+                entry = entries.get(path)
+                if entry is None:
+                    continue
+                if found[0] >= limit:
+                    capped[0] = True
+                    continue
+                found[0] += 1
+                found[1] += hits
+                batch.append(entry)
+                shown = ", ".join(str(line) for line in lines) + (", ..." if hits > len(lines) else "")
+                labels[path] = f"{hits} hits, line {shown}" if hits > 1 else f"1 hit, line {shown}"
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(cancel_event,)) as pool:
+            try:
+                pending = {}
+                for task in self._tasks(root, query, token, entries):
+                    while len(pending) >= self.workers * 2:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            collect(future)
+                            for path in pending.pop(future):
+                                entries.pop(path, None)
+                    scanned += len(task)
+                    pending[pool.submit(scan_files, task, needle, ignore_case)] = task
+                    if batch and time.perf_counter() - flushed_at >= self.BATCH_INTERVAL:
+                        on_batch(batch, labels, scanned)
+                        batch, labels = [], {}
+                        flushed_at = time.perf_counter()
+                    if capped[0]:
+                        break
+                for future in pending:
+                    collect(future)
+                token.raise_if_cancelled()
+            except BaseException:
+                cancel_event.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        if batch:
+            on_batch(batch, labels, scanned)
+        return found[0], found[1], scanned, capped[0]
+
+    @staticmethod
+    def _tasks(root, query, token, entries):
+        # Candidate files grouped into pool tasks; `entries` keeps their metadata for the result rows
+        task = []
+        task_bytes = 0
+        for dir_entry in walk(root, token):
+            try:
+                if not dir_entry.is_file(follow_symlinks=False):
+                    continue
+                entry = FileEntry.from_dir_entry(dir_entry)
+            except OSError:
+                continue
+            if not query.accepts(entry.name, entry.size):
+                continue
+            entries[entry.path] = entry
+            task.append(entry.path)
+            task_bytes += entry.size
+            if len(task) >= TASK_FILES or task_bytes >= TASK_BYTES:
+                yield task
+                task = []
+                task_bytes = 0
+        if task:
+            yield task
+
+    @staticmethod
+    def _deliver(token, callback, *args):
+        if not token.cancelled:
+            callback(*args)
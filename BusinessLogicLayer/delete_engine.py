@@ -0,0 +1,186 @@
+import errno
+import os
+import stat
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from CommonLayer import settings
+from CommonLayer.cancel_token import OperationCancelled
+
+
+class DeleteEngine:
+    def __init__(self, workers=None):
+        self.workers = workers or min(16, (os.cpu_count() or 1) * 2)
+
+    def delete(self, paths, token=None, progress=None, on_staged=None):
+        # Stage everything first so callers can drop the items from view, then reap the staged trees
+        staged, errors = self.stage(paths)
+        if on_staged is not None:
+            on_staged([original for original, _ in staged])
+        errors.extend(self.reap(staged, token, progress))
+        # Items that were put back after an error are not counted
+        deleted = sum(1 for original, target in staged if not os.path.lexists(target) and not os.path.lexists(original))
+        return {"deleted": deleted, "errors": errors}
+
+    @staticmethod
+    def stage(paths):
+        # A rename within the same folder is atomic, so every item disappears from its folder at once
+        staged = []
+        errors = []
+        for path in paths:
+            path = os.fspath(path)
+            staging = os.path.join(os.path.dirname(path), settings.DELETE_STAGING_NAME)
+            target = os.path.join(staging, f"{uuid.uuid4().hex}-{os.path.basename(path)}")
+            try:
+                os.makedirs(staging, exist_ok=True)
+                os.rename(path, target)
+            except FileNotFoundError:
+                errors.append((path, "The item does not exist."))
+            except OSError as e:
+                if e.errno in (errno.EXDEV, errno.EBUSY):
+                    # Mount points cannot be moved; remove them in place instead
+                    staged.append((path, path))
+                else:
+                    errors.append((path, e.strerror or str(e)))
+            else:
+                staged.append((path, target))
+        return staged, errors
+
+    def reap(self, staged, token=None, progress=None):
+        errors = []
+        removed = [0]
+        lock = threading.Lock()
+
+        def count(amount):
+            with lock:
+                removed[0] += amount
+                done = removed[0]
+            if progress is not None:
+                progress(done, 0, "items")
+
+        def report(path, error):
+            # Errors are reported against the original location, not the staging folder
+            for original, target in staged:
+                if path == target or path.startswith(target + os.sep):
+                    path = original + path[len(target):]
+                    break
+            with lock:
+                errors.append((path, error.strerror or str(error)))
+
+        try:
+            self._reap(staged, token, count, report)
+        except OperationCancelled:
+            self._restore(staged)
+            self._drop_staging(staged)
+            raise
+
+        # Items that could not be removed in full go back too, instead of staying in the hidden staging folder
+        for original, target, error in self._restore(staged):
+            errors.append((original, f"Could not be fully deleted; what is left is in '{target}' "
+                                     f"({error.strerror or error})"))
+        self._drop_staging(staged)
+        return errors
+
+    @staticmethod
+    def _restore(staged):
+        # Whatever is left goes back where it came from, so a cancelled or failed delete leaves no hidden leftovers.
+        # Returns (original, target, error) for what could not be put back.
+        stranded = []
+        for original, target in staged:
+            if target == original or not os.path.lexists(target):
+                continue
+            try:
+                if os.path.lexists(original):
+                    raise FileExistsError(errno.EEXIST, "Something new already exists at the original location")
+                os.rename(target, original)
+            except OSError as e:
+                stranded.append((original, target, e))
+        return stranded
+
+    def _reap(self, staged, token, count, report):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            trees = []
+            for original, target in staged:
+                try:
+                    is_dir = stat.S_ISDIR(os.lstat(target).st_mode)
+                except OSError as e:
+                    report(target, e)
+                    continue
+                if is_dir:
+                    trees.append(target)
+                else:
+                    self._unlink(target, report)
+                    count(1)
+            self._remove_trees(pool, trees, token, count, report)
+
+    @staticmethod
+    def _drop_staging(staged):
+        for original, target in staged:
+            # Drop the staging folder once it is empty; another delete may still be using it
+            if target != original:
+                try:
+                    os.rmdir(os.path.dirname(target))
+                except OSError:
+                    pass
+
+    def _remove_trees(self, pool, roots, token, count, report):
+        # Phase 1: clear files level by level in parallel, discovering subfolders as we go
+        directories = list(roots)
+        pending = {pool.submit(self._clear_directory, root, report) for root in roots}
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                subdirectories, removed = future.result()
+                count(removed)
+                directories.extend(subdirectories)
+                if token is None or not token.cancelled:
+                    pending.update(pool.submit(self._clear_directory, path, report) for path in subdirectories)
+
+        if token is not None and token.cancelled:
+            raise OperationCancelled()
+
+        # Phase 2: the folders themselves, deepest first
+        for path in sorted(directories, key=lambda directory: directory.count(os.sep), reverse=True):
+            try:
+                os.rmdir(path)
+                count(1)
+            except OSError as e:
+                report(path, e)
+
+    def _clear_directory(self, path, report):
+        subdirectories = []
+        removed = 0
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        subdirectories.append(entry.path)
+                    elif self._unlink(entry.path, report):
+                        removed += 1
+        except OSError as e:
+            report(path, e)
+        return subdirectories, removed
+
+    @staticmethod
+    def _unlink(path, report):
+        try:
+            os.unlink(path)
+            return True
+        except PermissionError:
+            # Read-only files (Windows) can be removed once they are made writable
+            try:
+                os.chmod(path, stat.S_IWRITE)
+                os.unlink(path)
+                return True
+            except OSError as e:
+                report(path, e)
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            report(path, e)
+        return False
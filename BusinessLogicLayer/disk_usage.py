@@ -0,0 +1,253 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from CommonLayer import settings
+from CommonLayer.cancel_token import CancelToken, OperationCancelled
+from DataAccessLayer.directory_lister import HIDDEN_NAMES
+
+
+class DirectoryUsage:
+    # One scanned folder: bytes of its own files, hard-linked files by (dev, ino) -> (size, nlink, links seen),
+    # subfolders and, once every subfolder is known, the memoized subtree summary
+    __slots__ = ("mtime_ns", "bytes", "linked", "children", "summary")
+
+    def __init__(self, mtime_ns, size, linked, children):
+        self.mtime_ns = mtime_ns
+        self.bytes = size
+        self.linked = linked
+        self.children = children
+        self.summary = None
+
+
+class DiskUsage:
+    def __init__(self, post=None, workers=None, max_directories=settings.DISK_USAGE_CACHE_DIRS):
+        # `post(callback, *args)` must run the callback on the UI thread
+        self.post = post
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.max_directories = max_directories
+        self.directories = {}
+        self.lock = threading.Lock()
+        self.current_token = None
+
+    def measure_async(self, roots, on_size, on_done=None):
+        # A newer measurement supersedes the running one; finished subtrees stay cached, so restarting is cheap
+        self.cancel()
+        token = CancelToken()
+        self.current_token = token
+
+        def deliver(root, total):
+            self.post(self._deliver, token, on_size, root, total)
+
+        def run():
+            try:
+                self.measure(roots, token, deliver)
+            except OperationCancelled:
+                return
+            if on_done is not None:
+                self.post(self._deliver, token, on_done)
+
+        threading.Thread(target=run, daemon=True).start()
+        return token
+
+    def cancel(self):
+        if self.current_token is not None:
+            self.current_token.cancel()
+            self.current_token = None
+
+    @staticmethod
+    def _deliver(token, callback, *args):
+        if not token.cancelled:
+            callback(*args)
+
+    def measure(self, roots, token=None, on_size=None):
+        # Scan every root's tree on one pool; each root is reported as soon as its own subtree is complete
+        roots = list(dict.fromkeys(os.fspath(root) for root in roots))
+        totals = {}
+        outstanding = {}
+        devices = {}
+
+        def finish(root):
+            totals[root] = self._summarize(root)
+            if on_size is not None:
+                on_size(root, totals[root])
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {}
+            for root in roots:
+                with self.lock:
+                    cached = self.directories.get(root)
+                    known = cached is not None and cached.summary is not None
+                if known and self._unchanged(root, cached):
+                    finish(root)
+                    continue
+                outstanding[root] = 1
+                pending[pool.submit(self._scan, root, None)] = root
+
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    root = pending.pop(future)
+                    outstanding[root] -= 1
+                    children, device = future.result()
+                    devices.setdefault(root, device)
+                    for child in children:
+                        if token is not None and token.cancelled:
+                            break
+                        outstanding[root] += 1
+                        pending[pool.submit(self._scan, child, devices[root])] = root
+                    if outstanding[root] == 0:
+                        finish(root)
+                if token is not None and token.cancelled:
+                    for future in pending:
+                        future.cancel()
+                    raise OperationCancelled()
+
+        with self.lock:
+            if len(self.directories) > self.max_directories:
+                # Keep memory bounded on huge disks; the next measurement starts from scratch
+                self.directories.clear()
+        return totals
+
+    @staticmethod
+    def _unchanged(path, record):
+        try:
+            return os.stat(path).st_mtime_ns == record.mtime_ns
+        except OSError:
+            return False
+
+    def _scan(self, path, device):
+        # Returns (subfolders still to scan, st_dev); cached folders whose mtime did not move are reused
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._store(path, DirectoryUsage(None, 0, None, []))
+            return [], None
+        if device is not None and stat.st_dev != device:
+            # Other filesystems mounted inside the tree are not part of its size
+            return [], device
+        with self.lock:
+            cached = self.directories.get(path)
+        if cached is not None and cached.mtime_ns == stat.st_mtime_ns:
+            return ([] if cached.summary is not None else cached.children), stat.st_dev
+
+        size = 0
+        linked = {}
+        children = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name in HIDDEN_NAMES:
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            children.append(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        entry_stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if entry_stat.st_nlink > 1:
+                        # Hard links are deduplicated by inode when subtrees are summed
+                        key = (entry_stat.st_dev, entry_stat.st_ino)
+                        seen = linked[key][2] + 1 if key in linked else 1
+                        linked[key] = (entry_stat.st_size, entry_stat.st_nlink, seen)
+                    else:
+                        size += entry_stat.st_size
+        except OSError:
+            children = []
+        resolved, linked = self._merge_linked([linked] if linked else [])
+        size += resolved
+        self._store(path, DirectoryUsage(stat.st_mtime_ns, size, linked or None, children))
+        return children, stat.st_dev
+
+    def _store(self, path, record):
+        with self.lock:
+            previous = self.directories.get(path)
+            self.directories[path] = record
+        if previous is not None:
+            # The folder changed, so every total above it is stale
+            self._invalidate_parents(path)
+
+    def _summarize(self, root):
+        # Post-order over the cached records, reusing the summary of every subtree that already has one
+        with self.lock:
+            stack = [(root, False)]
+            while stack:
+                path, ready = stack.pop()
+                record = self.directories.get(path)
+                if record is None or record.summary is not None:
+                    continue
+                if not ready:
+                    stack.append((path, True))
+                    stack.extend((child, False) for child in record.children)
+                    continue
+                size = record.bytes
+                sources = [record.linked] if record.linked else []
+                for child in record.children:
+                    summary = self.directories[child].summary if child in self.directories else None
+                    if summary is not None:
+                        size += summary[0]
+                        if summary[1]:
+                            sources.append(summary[1])
+                resolved, linked = self._merge_linked(sources)
+                record.summary = (size + resolved, linked)
+            record = self.directories.get(root)
+            if record is None or record.summary is None:
+                return 0
+            return self._total(record.summary)
+
+    def size(self, path):
+        with self.lock:
+            record = self.directories.get(os.fspath(path))
+            if record is None or record.summary is None:
+                return None
+            return self._total(record.summary)
+
+    @staticmethod
+    def _total(summary):
+        # Links that lead outside the subtree are still counted once
+        size, linked = summary
+        return size + (sum(entry[0] for entry in linked.values()) if linked else 0)
+
+    @staticmethod
+    def _merge_linked(sources):
+        # Returns (bytes of inodes whose every link is now seen, the still open ones or None). Open inodes are only
+        # carried up to the lowest folder holding all their links, and a lone source is shared, not copied, so
+        # memory does not grow with depth. Memoized dicts are never modified.
+        if not sources:
+            return 0, None
+        if len(sources) == 1 and all(seen < nlink for _, nlink, seen in sources[0].values()):
+            return 0, sources[0]
+        sources = sorted(sources, key=len, reverse=True)
+        merged = dict(sources[0])
+        for source in sources[1:]:
+            for key, (size, nlink, seen) in source.items():
+                if key in merged:
+                    seen += merged[key][2]
+                merged[key] = (size, nlink, seen)
+        resolved = 0
+        for key in [key for key, (_, nlink, seen) in merged.items() if seen >= nlink]:
+            resolved += merged.pop(key)[0]
+        return resolved, merged or None
+
+    def invalidate(self, path):
+        # Something inside `path` changed: rescan it next time and drop every total that includes it
+        path = os.fspath(path)
+        with self.lock:
+            self.directories.pop(path, None)
+        self._invalidate_parents(path)
+
+    def _invalidate_parents(self, path):
+        with self.lock:
+            parent = os.path.dirname(path)
+            while parent and parent != path:
+                record = self.directories.get(parent)
+                if record is not None:
+                    record.summary = None
+                path, parent = parent, os.path.dirname(parent)
+
+    def clear(self):
+        with self.lock:
+            self.directories.clear()
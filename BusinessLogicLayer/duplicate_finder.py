@@ -0,0 +1,207 @@
+import hashlib
+import mmap
+import os
+import stat
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Event
+
+from BusinessLogicLayer.search_engine import walk
+from CommonLayer.cancel_token import OperationCancelled
+from CommonLayer.file_entry import FileEntry
+from CommonLayer.formatting import format_size
+
+# Bytes hashed from each end of a file in the partial stage
+EDGE_BYTES = 16 * 1024
+# Slice of the mapping fed to the hash per update; large files are never read into memory whole
+HASH_CHUNK = 4 * 1024 * 1024
+# Files hashed per pool task, so small files do not pay one round trip each
+TASK_FILES = 64
+
+# Set by the pool initializer; lets the parent stop a full hash that is still running
+_worker_cancel = None
+
+
+def _init_worker(cancel_event):
+    global _worker_cancel
+    _worker_cancel = cancel_event
+
+
+def hash_file(path, partial):
+    # blake2b over an mmap of the file: the first and last EDGE_BYTES only, or the whole content
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as source:
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            if partial and size > 2 * EDGE_BYTES:
+                digest.update(mapped[:EDGE_BYTES])
+                digest.update(mapped[size - EDGE_BYTES:])
+                return digest.digest()
+            for offset in range(0, size, HASH_CHUNK):
+                if _worker_cancel is not None and _worker_cancel.is_set():
+                    raise OperationCancelled()
+                digest.update(mapped[offset:offset + HASH_CHUNK])
+    return digest.digest()
+
+
+def hash_files(paths, partial):
+    # One pool task; files that vanished or cannot be read come back as None
+    results = []
+    for path in paths:
+        try:
+            results.append(hash_file(path, partial))
+        except (OSError, ValueError):
+            results.append(None)
+    return results
+
+
+class Candidate:
+    __slots__ = ("path", "dev", "ino", "size", "mtime_ns", "partial", "full")
+
+    def __init__(self, path, dev, ino, size, mtime_ns):
+        self.path = path
+        self.dev = dev
+        self.ino = ino
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.partial = None
+        self.full = None
+
+
+class DuplicateFinder:
+    def __init__(self, cache=None, workers=None):
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+
+    @staticmethod
+    def collect(root, token=None):
+        # Regular files with their inode identity; extra hard links to one inode are not duplicates
+        files = []
+        seen = set()
+        for entry in walk(root, token):
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                entry_stat = entry.stat(follow_symlinks=False)
+                if entry_stat.st_ino == 0:
+                    # Windows scandir does not fill in the inode
+                    entry_stat = os.stat(entry.path, follow_symlinks=False)
+            except OSError:
+                continue
+            if not stat.S_ISREG(entry_stat.st_mode) or entry_stat.st_size == 0:
+                continue
+            identity = (entry_stat.st_dev, entry_stat.st_ino)
+            if identity in seen:
+                continue
+            seen.add(identity)
+            files.append(Candidate(entry.path, entry_stat.st_dev, entry_stat.st_ino, entry_stat.st_size,
+                                   entry_stat.st_mtime_ns))
+        return files
+
+    @staticmethod
+    def group(candidates, key):
+        groups = {}
+        for candidate in candidates:
+            groups.setdefault(key(candidate), []).append(candidate)
+        return [members for value, members in groups.items() if len(members) > 1 and value[-1] is not None]
+
+    def find(self, root, token=None, progress=None):
+        started = time.perf_counter()
+        files = self.collect(root, token)
+
+        # Stage 1: only files that share their size with another file can be duplicates
+        candidates = [member for members in self.group(files, lambda c: (c.size,)) for member in members]
+        cached = self._load_cached(candidates)
+        if not candidates:
+            return {"groups": [], "reclaimable": 0, "files": len(files), "hashed": 0, "cached": 0,
+                    "seconds": time.perf_counter() - started}
+
+        # Stage 2: first and last few KB; for small files this already covers the whole content
+        todo = [candidate for candidate in candidates if candidate.partial is None]
+        hashed = len(todo)
+        self._hash(todo, True, token, progress)
+        for candidate in candidates:
+            if candidate.size <= 2 * EDGE_BYTES:
+                candidate.full = candidate.partial
+
+        # Stage 3: full content, only for files whose size and partial hash still collide
+        colliding = [member for members in self.group(candidates, lambda c: (c.size, c.partial))
+                     for member in members]
+        todo = [candidate for candidate in colliding if candidate.full is None]
+        hashed += len(todo)
+        self._hash(todo, False, token, progress)
+
+        if self.cache is not None:
+            self.cache.store([(c.dev, c.ino, c.size, c.mtime_ns, c.partial, c.full)
+                              for c in candidates if c.partial is not None])
+
+        groups = self.group(colliding, lambda c: (c.size, c.full))
+        # Biggest savings first; every copy but one could be reclaimed
+        groups.sort(key=lambda members: members[0].size * (len(members) - 1), reverse=True)
+        return {"groups": [(members[0].size, [member.path for member in members]) for members in groups],
+                "reclaimable": sum(members[0].size * (len(members) - 1) for members in groups),
+                "files": len(files), "hashed": hashed, "cached": len(cached),
+                "seconds": time.perf_counter() - started}
+
+    def _load_cached(self, candidates):
+        if self.cache is None or not candidates:
+            return {}
+        cached = self.cache.lookup([(c.dev, c.ino, c.size, c.mtime_ns) for c in candidates])
+        for candidate in candidates:
+            hashes = cached.get((candidate.dev, candidate.ino))
+            if hashes is not None:
+                candidate.partial, candidate.full = hashes
+        return cached
+
+    def _hash(self, candidates, partial, token, progress):
+        # A process pool is only started when something is not in the cache
+        if not candidates:
+            return
+        cancel_event = Event()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(cancel_event,)) as pool:
+            try:
+                self._hash_in_pool(pool, candidates, partial, token, progress)
+            except BaseException:
+                cancel_event.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    def _hash_in_pool(self, pool, candidates, partial, token, progress):
+        # Largest files first so the long full hashes start early and the pool drains evenly
+        candidates = sorted(candidates, key=lambda candidate: candidate.size, reverse=True)
+        tasks = [candidates[start:start + TASK_FILES] for start in range(0, len(candidates), TASK_FILES)]
+        window = self.workers * 2
+        futures = []
+        done = 0
+        for index in range(len(tasks)):
+            while len(futures) < len(tasks) and len(futures) < index + window:
+                batch = tasks[len(futures)]
+                futures.append(pool.submit(hash_files, [candidate.path for candidate in batch], partial))
+            if token is not None:
+                token.raise_if_cancelled()
+            for candidate, digest in zip(tasks[index], futures[index].result()):
+                if partial:
+                    candidate.partial = digest
+                else:
+                    candidate.full = digest
+            futures[index] = None
+            done += len(tasks[index])
+            if progress is not None:
+                progress(done, len(candidates), "files")
+
+    @staticmethod
+    def entries(result):
+        # FileEntry rows for the pane, plus a label per row naming its duplicate set
+        entries = []
+        labels = {}
+        for number, (size, paths) in enumerate(result["groups"], 1):
+            for path in paths:
+                try:
+                    entry = FileEntry.from_path(path)
+                except OSError:
+                    continue
+                entries.append(entry)
+                labels[path] = (f"Set {number:05d}: {len(paths)} copies, "
+                                f"{format_size(size * (len(paths) - 1))} reclaimable")
+        return entries, labels
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from CommonLayer import settings
+from CommonLayer.app_paths import sibling_temp_file
+from CommonLayer.cancel_token import CancelToken, OperationCancelled
+
+CHUNK_SIZE = 1024 * 1024
+# Ratio checks only apply above this size; tiny members compress absurdly well and are harmless
+RATIO_MIN_BYTES = 1024 * 1024
+
+
+class ZipSafetyError(Exception):
+    pass
+
+
+class ArchiveInfo:
+    __slots__ = ("members", "needs_password", "total_bytes")
+
+    def __init__(self, members, needs_password, total_bytes):
+        self.members = members
+        self.needs_password = needs_password
+        self.total_bytes = total_bytes
+
+
+def safe_target(destination, filename):
+    # Same rules as zipfile's extract: drop drive letters, absolute roots, "." and ".." components
+    filename = os.path.splitdrive(filename.replace("\\", "/"))[1]
+    parts = [part for part in filename.split("/") if part not in ("", ".", "..")]
+    return os.path.join(destination, *parts) if parts else None
+
+
+class ExtractEngine:
+    def __init__(self, workers=None, max_member_bytes=settings.EXTRACT_MAX_MEMBER_BYTES,
+                 max_total_bytes=settings.EXTRACT_MAX_TOTAL_BYTES, max_ratio=settings.EXTRACT_MAX_RATIO):
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 2)
+        self.max_member_bytes = max_member_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_ratio = max_ratio
+
+    @staticmethod
+    def inspect(zip_path):
+        # Reads only the central directory; nothing is decompressed
+        import pyzipper
+
+        with pyzipper.AESZipFile(zip_path) as zf:
+            members = zf.infolist()
+        needs_password = any(info.flag_bits & 0x1 for info in members)
+        return ArchiveInfo(members, needs_password, sum(info.file_size for info in members))
+
+    @staticmethod
+    def check_password(zip_path, info, password):
+        # Opening an encrypted member validates the password verifier without extracting anything
+        import pyzipper
+
+        encrypted = next((member for member in info.members if member.flag_bits & 0x1), None)
+        if encrypted is None:
+            return True
+        with pyzipper.AESZipFile(zip_path) as zf:
+            zf.setpassword(password.encode("utf-8"))
+            try:
+                with zf.open(encrypted) as stream:
+                    stream.read(1)
+            except RuntimeError:
+                return False
+        return True
+
+    def check_limits(self, info):
+        if info.total_bytes > self.max_total_bytes:
+            raise ZipSafetyError(f"The archive expands to {info.total_bytes} bytes, "
+                                 f"more than the limit of {self.max_total_bytes}.")
+        for member in info.members:
+            if member.file_size > self.max_member_bytes:
+                raise ZipSafetyError(f"'{member.filename}' expands to {member.file_size} bytes, "
+                                     f"more than the limit of {self.max_member_bytes}.")
+            if member.file_size > RATIO_MIN_BYTES and member.file_size > member.compress_size * self.max_ratio:
+                raise ZipSafetyError(f"'{member.filename}' has a suspicious compression ratio "
+                                     f"({member.file_size} from {member.compress_size} bytes).")
+
+    def extract(self, zip_path, destination, password=None, token=None, progress=None, info=None):
+        import pyzipper
+
+        info = info or self.inspect(zip_path)
+        token = token or CancelToken()
+        self.check_limits(info)
+        os.makedirs(destination, exist_ok=True)
+
+        local = threading.local()
+        handles = []
+        handles_lock = threading.Lock()
+        done = [0]
+        done_lock = threading.Lock()
+        started = time.perf_counter()
+
+        def archive():
+            # zipfile handles share one file position, so every worker thread opens its own
+            zf = getattr(local, "zf", None)
+            if zf is None:
+                zf = pyzipper.AESZipFile(zip_path)
+                if password:
+                    zf.setpassword(password.encode("utf-8"))
+                local.zf = zf
+                with handles_lock:
+                    handles.append(zf)
+            return zf
+
+        def extract_member(member):
+            target = safe_target(destination, member.filename)
+            if target is None:
+                return
+            if member.is_dir():
+                os.makedirs(target, exist_ok=True)
+                return
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            fd, partial = sibling_temp_file(target)
+            try:
+                # zipfile stops at the declared size and verifies the CRC, so lying headers cannot overrun
+                with os.fdopen(fd, "wb") as out, archive().open(member) as source:
+                    while True:
+                        token.raise_if_cancelled()
+                        chunk = source.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                        with done_lock:
+                            done[0] += len(chunk)
+                            written = done[0]
+                        if progress is not None:
+                            progress(written, info.total_bytes)
+                os.replace(partial, target)
+            except BaseException:
+                # A cancelled or failed member never leaves a half-written file behind
+                try:
+                    os.remove(partial)
+                except OSError:
+                    pass
+                raise
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                # Largest members first so one big file does not finish alone at the end
+                ordered = sorted(info.members, key=lambda member: member.file_size, reverse=True)
+                futures = [pool.submit(extract_member, member) for member in ordered]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    # Stop the other workers; their partial members are removed as they unwind
+                    token.cancel()
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise
+        finally:
+            for zf in handles:
+                zf.close()
+
+        if token.cancelled:
+            raise OperationCancelled()
+        if progress is not None:
+            progress(info.total_bytes, info.total_bytes)
+        return {"members": len(info.members), "bytes": done[0], "seconds": time.perf_counter() - started}
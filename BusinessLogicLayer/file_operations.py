@@ -0,0 +1,100 @@
+import os
+
+from CommonLayer import settings
+from CommonLayer.cancel_token import CancelToken
+
+
+class ZipPasswordError(Exception):
+    pass
+
+
+def zip_destination(items, zip_name):
+    # New archives go next to the first selected item, whose folder is also the base for member names
+    base_dir = os.path.dirname(os.path.normpath(os.fspath(items[0])))
+    return os.path.join(base_dir, f"{zip_name}.zip"), base_dir
+
+
+def extract_destination(zip_path, folder_name=None):
+    # A folder beside the archive, named after it unless a name is given
+    zip_path = os.path.normpath(os.fspath(zip_path))
+    return os.path.join(os.path.dirname(zip_path), folder_name or os.path.splitext(os.path.basename(zip_path))[0])
+
+
+class FileOperations:
+    # Listing, search, zip, extract and delete without any UI; the GUI and the batch CLI both sit on top of this.
+    # Engines are imported where they are first used, so a headless caller only loads what its command needs.
+    def __init__(self, index=None, workers=None):
+        self.index = index
+        self.workers = workers
+        self.zip_browser = None
+
+    def list_folder(self, path, token=None):
+        # FileEntry rows of one folder, or of a folder inside a zip archive
+        from DataAccessLayer.directory_lister import DirectoryLister
+        from DataAccessLayer.zip_browser import ZipBrowser, split_archive_path
+
+        path = os.fspath(path)
+        if split_archive_path(path) is not None:
+            if self.zip_browser is None:
+                self.zip_browser = ZipBrowser()
+            return iter(self.zip_browser.list(path))
+        return DirectoryLister.iter_entries(path, token)
+
+    def search(self, root, search_term, on_batch, token=None, use_index=False, limit=settings.SEARCH_RESULT_CAP):
+        # on_batch(entries, labels) per batch of matches; labels is None for file-name matches
+        from BusinessLogicLayer.content_search import ContentSearchEngine, parse_query
+
+        token = token or CancelToken()
+        content_query = parse_query(search_term)
+        if content_query is not None:
+            found, hits, scanned, capped = ContentSearchEngine(None, self.workers).search(
+                root, content_query, token, lambda entries, labels, _: on_batch(entries, labels), limit)
+            return {"found": found, "hits": hits, "scanned": scanned, "capped": capped, "indexed": False}
+
+        from BusinessLogicLayer.search_engine import SearchEngine
+
+        indexed = use_index and self.index is not None and self.index.indexed_root(root) is not None
+        found, scanned, capped = SearchEngine(None, self.index).search(
+            root, search_term, token, lambda entries, _: on_batch(entries, None), indexed, limit)
+        return {"found": found, "scanned": scanned, "capped": capped, "indexed": indexed}
+
+    def zip(self, items, zip_path, password=None, token=None, progress=None, base_dir=None):
+        from BusinessLogicLayer.zip_engine import ZipEngine
+
+        if base_dir is None:
+            base_dir = os.path.dirname(os.path.normpath(os.fspath(items[0])))
+        return ZipEngine(self.workers).create(zip_path, items, base_dir, password, token, progress)
+
+    def check_archive(self, zip_path, password=None):
+        # Central directory, zip-bomb limits and, when given, the password, all before anything is written
+        from BusinessLogicLayer.extract_engine import ExtractEngine
+
+        engine = ExtractEngine()
+        info = engine.inspect(zip_path)
+        engine.check_limits(info)
+        if password is not None:
+            self.check_password(zip_path, info, password)
+        return info
+
+    @staticmethod
+    def check_password(zip_path, info, password):
+        from BusinessLogicLayer.extract_engine import ExtractEngine
+
+        if info.needs_password and not ExtractEngine.check_password(zip_path, info, password):
+            raise ZipPasswordError("The password is incorrect.")
+
+    def extract(self, zip_path, destination=None, password=None, token=None, progress=None, info=None):
+        from BusinessLogicLayer.extract_engine import ExtractEngine
+
+        info = info or self.check_archive(zip_path, password)
+        if info.needs_password and not password:
+            raise ZipPasswordError("The archive is encrypted; a password is needed.")
+        destination = destination or extract_destination(zip_path)
+        result = ExtractEngine().extract(zip_path, destination, password, token, progress, info)
+        result["destination"] = os.fspath(destination)
+        return result
+
+    def delete(self, paths, token=None, progress=None, on_staged=None):
+        from BusinessLogicLayer.delete_engine import DeleteEngine
+
+        return DeleteEngine().delete(paths, token, progress, on_staged)
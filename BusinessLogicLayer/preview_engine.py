@@ -0,0 +1,119 @@
+import mmap
+import os
+import threading
+
+from CommonLayer import settings
+from DataAccessLayer.thumbnail_cache import Thumbnail
+from DataAccessLayer.zip_browser import split_archive_path
+
+IMAGE_EXTENSIONS = frozenset((".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp", ".tif", ".tiff", ".ico"))
+MAX_ARCHIVE_MEMBERS = 500
+
+
+def text_head(path, max_bytes=settings.PREVIEW_TEXT_BYTES):
+    # The first few KB through mmap, cut at the last full line; None for binary files
+    with open(path, "rb") as source:
+        size = os.fstat(source.fileno()).st_size
+        if size == 0:
+            return ""
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            head = mapped[:max_bytes]
+    if b"\0" in head:
+        return None
+    if size > max_bytes and b"\n" in head:
+        head = head[:head.rindex(b"\n")]
+    return head.decode("utf-8", errors="replace")
+
+
+def decode_thumbnail(path, max_size):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        # JPEG can decode straight at a reduced scale, which is most of the cost for large photos
+        image.draft("RGB", (max_size, max_size))
+        image.thumbnail((max_size, max_size))
+        image = image.convert("RGBA")
+        return Thumbnail(image.mode, image.size, image.tobytes())
+
+
+def archive_members(path):
+    import pyzipper
+
+    with pyzipper.AESZipFile(path) as zf:
+        infos = zf.infolist()
+    return len(infos), [(info.filename, info.file_size) for info in infos[:MAX_ARCHIVE_MEMBERS]]
+
+
+class PreviewEngine:
+    # One worker thread decodes previews; only the most recent request is ever worked on
+    def __init__(self, post, thumbnails=None, max_size=settings.PREVIEW_THUMBNAIL_SIZE):
+        # `post(callback, *args)` must run the callback on the UI thread
+        self.post = post
+        self.thumbnails = thumbnails
+        self.max_size = max_size
+        self.generation = 0
+        self.request = None
+        self.condition = threading.Condition()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def preview_async(self, path, on_preview):
+        # on_preview(path, kind, value) runs on the UI thread; kind is "text", "image", "archive" or "none"
+        with self.condition:
+            self.generation += 1
+            self.request = (self.generation, path, on_preview)
+            self.condition.notify()
+
+    def cancel(self):
+        with self.condition:
+            self.generation += 1
+            self.request = None
+
+    def current(self, generation):
+        return generation == self.generation
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.request is None:
+                    self.condition.wait()
+                generation, path, on_preview = self.request
+                self.request = None
+            # A newer selection may have arrived while this one waited; skip straight to it
+            if not self.current(generation):
+                continue
+            try:
+                kind, value = self.load(path, lambda: self.current(generation))
+            except Exception as e:
+                kind, value = "none", f"No preview: {e.strerror if isinstance(e, OSError) else e}"
+            self.post(self._deliver, generation, on_preview, path, kind, value)
+
+    def _deliver(self, generation, on_preview, path, kind, value):
+        if self.current(generation):
+            on_preview(path, kind, value)
+
+    def load(self, path, still_wanted=lambda: True):
+        if os.path.isdir(path):
+            return "none", "Folder"
+        if split_archive_path(path) is not None and not os.path.isfile(path):
+            return "none", "Extract the archive to preview its contents"
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension in IMAGE_EXTENSIONS:
+            return "image", self.thumbnail(path, still_wanted)
+        if extension == ".zip":
+            return "archive", archive_members(path)
+
+        text = text_head(path)
+        if text is None:
+            return "none", "Binary file"
+        return "text", text
+
+    def thumbnail(self, path, still_wanted):
+        if self.thumbnails is None:
+            return decode_thumbnail(path, self.max_size)
+        key = self.thumbnails.key(path, self.max_size)
+        thumbnail = self.thumbnails.get(key)
+        if thumbnail is None and still_wanted():
+            thumbnail = decode_thumbnail(path, self.max_size)
+            self.thumbnails.put(key, thumbnail)
+        return thumbnail
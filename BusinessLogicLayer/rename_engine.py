@@ -0,0 +1,227 @@
+import errno
+import os
+import re
+import time
+import uuid
+
+from CommonLayer.cancel_token import OperationCancelled
+
+# {name} and {ext} of the original item, {n} or {n:03} for a running counter
+PLACEHOLDER = re.compile(r"\{(name|ext|n)(?::(\d+))?\}")
+# s/regex/replacement/flags, applied to the name without its extension
+SUBSTITUTION = re.compile(r"^s/((?:\\.|[^\\/])*)/((?:\\.|[^\\/])*)/([ai]*)$")
+REGEX_FLAGS = {"i": re.IGNORECASE, "a": re.ASCII}
+# Items in the way of another rename are parked under this prefix, in their own folder, between the two phases
+TEMP_PREFIX = ".rename-"
+INVALID_CHARACTERS = set('<>:"/\\|?*') if os.name == "nt" else {"/"}
+
+
+class RenamePatternError(Exception):
+    pass
+
+
+class RenamePattern:
+    def __init__(self, pattern, start=1, keep_extension=True):
+        self.start = start
+        self.keep_extension = keep_extension
+        self.regex = None
+        substitution = SUBSTITUTION.match(pattern)
+        if substitution is not None:
+            find, self.template, flags = substitution.groups()
+            try:
+                self.regex = re.compile(find, sum(REGEX_FLAGS[flag] for flag in set(flags)))
+            except re.error as e:
+                raise RenamePatternError(f"Invalid regular expression: {e}")
+        else:
+            self.template = pattern
+        if not self.template and self.regex is None:
+            raise RenamePatternError("The new name is empty.")
+        # A plain name without placeholders renames one item as typed, several as "name (1)", "name (2)", ...
+        self.literal = self.regex is None and PLACEHOLDER.search(self.template) is None
+        # A typed name with an extension of its own replaces the item's extension instead of gaining a second one
+        self.own_extension = self.literal and bool(os.path.splitext(self.template)[1])
+
+    def for_count(self, count):
+        if self.literal and count > 1:
+            # The counter goes before the typed extension: "foo.txt" -> "foo (1).txt"
+            stem, typed_ext = os.path.splitext(self.template)
+            numbered = RenamePattern(f"{stem} ({{n}}){typed_ext}", self.start, self.keep_extension)
+            numbered.own_extension = self.own_extension
+            return numbered
+        return self
+
+    def apply(self, name, is_dir, number):
+        stem, ext = (name, "") if is_dir or not self.keep_extension else os.path.splitext(name)
+        values = {"name": stem, "ext": ext[1:], "n": number}
+
+        def expand(match, escape=False):
+            value = format(values[match.group(1)], f"0{match.group(2)}" if match.group(2) else "")
+            return value.replace("\\", "\\\\") if escape else value
+
+        if self.regex is not None:
+            new_name = self.regex.sub(PLACEHOLDER.sub(lambda match: expand(match, True), self.template), stem)
+        else:
+            new_name = PLACEHOLDER.sub(expand, self.template)
+            if "{ext" in self.template or self.own_extension:
+                # The pattern placed the extension itself, or a typed name brought its own
+                return new_name
+        return new_name + ext
+
+
+def check_name(name):
+    if not name or name in (".", ".."):
+        return "The new name is empty."
+    if "\0" in name or not INVALID_CHARACTERS.isdisjoint(name):
+        return f"'{name}' contains characters that are not allowed in a name."
+    if name.startswith(TEMP_PREFIX):
+        return f"Names starting with '{TEMP_PREFIX}' are reserved."
+    return None
+
+
+class RenamePlan:
+    # Every rename in a batch, checked against each other and the disk before anything is renamed
+    def __init__(self):
+        self.renames = []
+        # Sources that are another item's target; they move to a temporary name first
+        self.parked = set()
+        self.cycles = 0
+        self.unchanged = 0
+        self.conflicts = []
+
+
+class RenameEngine:
+    @staticmethod
+    def plan(paths, pattern, token=None):
+        # One pass over the items in display order; `paths` may span several folders
+        plan = RenamePlan()
+        pattern = pattern.for_count(len(paths))
+        listings = {}
+        targets = {}
+        for number, path in enumerate(paths, pattern.start):
+            if token is not None and number % 1024 == 0:
+                token.raise_if_cancelled()
+            path = os.path.normpath(os.fspath(path))
+            folder, name = os.path.split(path)
+            try:
+                new_name = pattern.apply(name, pattern.keep_extension and os.path.isdir(path), number)
+            except (re.error, IndexError) as e:
+                # Bad group references in a replacement only show up once something matches
+                raise RenamePatternError(f"Invalid replacement: {e}")
+            problem = check_name(new_name)
+            if problem is not None:
+                plan.conflicts.append((path, problem))
+                continue
+            if new_name == name:
+                plan.unchanged += 1
+                continue
+            target = os.path.join(folder, new_name)
+            other = targets.setdefault(os.path.normcase(target), path)
+            if other != path:
+                plan.conflicts.append((path, f"'{new_name}' is also the new name of '{os.path.basename(other)}'."))
+                continue
+            if folder not in listings:
+                # One listing per folder instead of one existence check per target
+                try:
+                    listings[folder] = {os.path.normcase(entry) for entry in os.listdir(folder or ".")}
+                except OSError as e:
+                    plan.conflicts.append((path, e.strerror or str(e)))
+                    continue
+            plan.renames.append((path, target))
+
+        moving = {os.path.normcase(source): os.path.normcase(target) for source, target in plan.renames}
+        for source, target in plan.renames:
+            folder, new_name = os.path.split(target)
+            key = moving[os.path.normcase(source)]
+            if key == os.path.normcase(source):
+                # A case-only change of the same item
+                continue
+            if key in moving:
+                plan.parked.add(key)
+            elif os.path.normcase(new_name) in listings[folder]:
+                plan.conflicts.append((source, f"'{new_name}' already exists."))
+        plan.cycles = RenameEngine.count_cycles(moving)
+        return plan
+
+    @staticmethod
+    def count_cycles(moving):
+        # Chains like a -> b -> c only need the right order; cycles like a <-> b cannot be done without a temp name
+        cycles = 0
+        visited = {}
+        for start in moving:
+            node = start
+            while node in moving and node not in visited:
+                visited[node] = start
+                following = moving[node]
+                if following == node:
+                    break
+                node = following
+            if node in moving and visited.get(node) == start and moving[node] != node:
+                cycles += 1
+        return cycles
+
+    def rename(self, paths, pattern, token=None, progress=None):
+        plan = self.plan(paths, pattern, token)
+        if plan.conflicts:
+            # Nothing is touched unless the whole batch can go through
+            return {"renamed": [], "unchanged": plan.unchanged, "conflicts": plan.conflicts, "cycles": plan.cycles,
+                    "errors": [], "rolled_back": False, "seconds": 0.0}
+        return self.apply(plan, token, progress)
+
+    def apply(self, plan, token=None, progress=None):
+        # Phase 1 parks the items that are in the way; phase 2 moves every item to its final name
+        started = time.perf_counter()
+        journal = []
+        total = len(plan.renames) + len(plan.parked)
+        current = {}
+        try:
+            for source, _ in plan.renames:
+                if os.path.normcase(source) in plan.parked:
+                    folder = os.path.dirname(source)
+                    parked = os.path.join(folder, f"{TEMP_PREFIX}{uuid.uuid4().hex}")
+                    self._step(source, parked, journal, token, progress, total)
+                    current[source] = parked
+            for source, target in plan.renames:
+                location = current.get(source, source)
+                if os.path.lexists(target) and not self.same_item(location, target):
+                    # os.rename replaces files silently on POSIX; the target appeared after planning
+                    raise FileExistsError(errno.EEXIST, f"'{os.path.basename(target)}' already exists", target)
+                self._step(location, target, journal, token, progress, total)
+        except OperationCancelled:
+            self.rollback(journal)
+            raise
+        except OSError as e:
+            errors = [(e.filename or source, e.strerror or str(e))]
+            errors.extend(self.rollback(journal))
+            return {"renamed": [], "unchanged": plan.unchanged, "conflicts": [], "cycles": plan.cycles,
+                    "errors": errors, "rolled_back": True, "seconds": time.perf_counter() - started}
+        return {"renamed": plan.renames, "unchanged": plan.unchanged, "conflicts": [], "cycles": plan.cycles,
+                "errors": [], "rolled_back": False, "seconds": time.perf_counter() - started}
+
+    @staticmethod
+    def _step(source, target, journal, token, progress, total):
+        if token is not None:
+            token.raise_if_cancelled()
+        os.rename(source, target)
+        journal.append((source, target))
+        if progress is not None:
+            progress(len(journal), total, "items")
+
+    @staticmethod
+    def rollback(journal):
+        # Undo the completed steps newest first, which also brings parked items back
+        errors = []
+        while journal:
+            source, target = journal.pop()
+            try:
+                os.rename(target, source)
+            except OSError as e:
+                errors.append((source, f"could not be restored from '{os.path.basename(target)}': "
+                                       f"{e.strerror or str(e)}"))
+        return errors
+
+    @staticmethod
+    def same_item(first, second):
+        try:
+            return os.path.samestat(os.lstat(first), os.lstat(second))
+        except OSError:
+            return False
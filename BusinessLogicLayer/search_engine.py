@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+from CommonLayer import settings
+from CommonLayer.cancel_token import CancelToken, OperationCancelled
+from CommonLayer.file_entry import FileEntry
+from DataAccessLayer.directory_lister import HIDDEN_NAMES
+
+
+def name_matcher(search_term):
+    # "*ext" matches the end of the name, anything else is a case-insensitive substring
+    search_term = search_term.lower()
+    if search_term.startswith("*"):
+        ext = search_term[1:]
+        return lambda name: name.lower().endswith(ext)
+    return lambda name: search_term in name.lower()
+
+
+def walk(root, token=None):
+    # Depth-first scandir walk that yields every DirEntry below `root` without following symlinks.
+    # The app's own hidden folders (items being deleted) are neither yielded nor entered.
+    stack = [os.fspath(root)]
+    while stack:
+        if token is not None:
+            token.raise_if_cancelled()
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.name in HIDDEN_NAMES:
+                        continue
+                    yield entry
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            continue
+
+
+def walk_matches(root, search_term, token=None, counter=None):
+    matches = name_matcher(search_term)
+    for entry in walk(root, token):
+        if counter is not None:
+            counter[0] += 1
+        if matches(entry.name):
+            try:
+                yield FileEntry.from_dir_entry(entry)
+            except OSError:
+                continue
+
+
+def index_matches(index, root, search_term, limit, token=None):
+    for path in index.search(root, search_term, limit):
+        if token is not None:
+            token.raise_if_cancelled()
+        try:
+            yield FileEntry.from_path(path)
+        except OSError:
+            continue
+
+
+class SearchEngine:
+    BATCH_SIZE = 500
+    BATCH_INTERVAL = 0.1
+
+    def __init__(self, post, index=None):
+        # `post(callback, *args)` must run the callback on the UI thread
+        self.post = post
+        self.index = index
+        self.generation = 0
+        self.current_token = None
+
+    def search_async(self, root, search_term, on_batch, on_done, use_index=False,
+                     limit=settings.SEARCH_RESULT_CAP):
+        # Every search is a new generation; whatever the previous one still delivers is dropped
+        self.cancel()
+        self.generation += 1
+        token = CancelToken()
+        self.current_token = token
+
+        worker = threading.Thread(target=self._run, daemon=True,
+                                  args=(root, search_term, use_index, limit, token, on_batch, on_done))
+        worker.start()
+        return self.generation
+
+    def cancel(self):
+        if self.current_token is not None:
+            self.current_token.cancel()
+            self.current_token = None
+
+    def _run(self, root, search_term, use_index, limit, token, on_batch, on_done):
+        try:
+            found, scanned, capped = self.search(
+                root, search_term, token, lambda *batch: self.post(self._deliver, token, on_batch, *batch),
+                use_index, limit)
+        except OperationCancelled:
+            return
+        self.post(self._deliver, token, on_done, found, scanned, capped)
+
+    def search(self, root, search_term, token, on_batch, use_index=False, limit=settings.SEARCH_RESULT_CAP):
+        # Pipeline: source (index or walk) -> single stat -> batch; on_batch(entries, scanned) runs on this thread
+        scanned = [0]
+        if use_index and self.index is not None:
+            # One row past the limit tells a full page of results from a truncated one
+            source = index_matches(self.index, root, search_term, limit + 1, token)
+        else:
+            source = walk_matches(root, search_term, token, scanned)
+
+        found = 0
+        capped = False
+        batch = []
+        flushed_at = time.perf_counter()
+        for entry in source:
+            if found >= limit:
+                # Only a match beyond the limit means results were left out
+                capped = True
+                break
+            batch.append(entry)
+            found += 1
+            if len(batch) >= self.BATCH_SIZE or time.perf_counter() - flushed_at >= self.BATCH_INTERVAL:
+                on_batch(batch, scanned[0])
+                batch = []
+                flushed_at = time.perf_counter()
+
+        if batch:
+            on_batch(batch, scanned[0])
+        return found, scanned[0], capped
+
+    @staticmethod
+    def _deliver(token, callback, *args):
+        if not token.cancelled:
+            callback(*args)
@@ -0,0 +1,407 @@
+import errno
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from CommonLayer.cancel_token import OperationCancelled
+
+SKIP = "skip"
+OVERWRITE = "overwrite"
+RENAME = "rename"
+
+# Bytes per kernel copy call; small enough that cancel and progress stay responsive on huge files
+CHUNK_SIZE = 8 * 1024 * 1024
+# Partial copies at least this large are kept on cancel so the next paste continues where this one stopped
+RESUME_MIN_BYTES = 64 * 1024 * 1024
+# A copy in progress is written to ".<name>.<uuid>.fecopy" next to its target, a name only this engine creates
+PARTIAL_SUFFIX = ".fecopy"
+# Beside a resumable partial copy: the source (path, size, mtime_ns) it is a copy of
+IDENTITY_SUFFIX = ".source"
+
+# Kernel-side copy is not available for every pair of filesystems; these mean "use the next method"
+FALLBACK_ERRORS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ENOTSOCK)
+
+
+def unique_target(target):
+    # "report.txt" -> "report (2).txt", the first name that is free
+    if not os.path.lexists(target):
+        return target
+    base, ext = os.path.splitext(target)
+    if os.path.isdir(target):
+        base, ext = target, ""
+    number = 2
+    while os.path.lexists(f"{base} ({number}){ext}"):
+        number += 1
+    return f"{base} ({number}){ext}"
+
+
+def same_file(source_stat, target_path):
+    # A target with the same size and mtime is an earlier, completed copy of this file
+    try:
+        target_stat = os.stat(target_path)
+    except OSError:
+        return False
+    return target_stat.st_size == source_stat.st_size and target_stat.st_mtime_ns == source_stat.st_mtime_ns
+
+
+def copy_data(source_fd, target_fd, size, offset, token=None, advance=None):
+    # copy_file_range (in-kernel, reflinks where supported) -> sendfile -> read/write, from `offset` onwards
+    copy_file_range = getattr(os, "copy_file_range", None)
+    sendfile = getattr(os, "sendfile", None) if os.name != "nt" else None
+
+    while offset < size and copy_file_range is not None:
+        if token is not None:
+            token.raise_if_cancelled()
+        try:
+            copied = copy_file_range(source_fd, target_fd, min(CHUNK_SIZE, size - offset), offset, offset)
+        except OSError as e:
+            if e.errno not in FALLBACK_ERRORS:
+                raise
+            copy_file_range = None
+            break
+        if copied == 0:
+            return offset
+        offset += copied
+        if advance is not None:
+            advance(copied)
+
+    os.lseek(target_fd, offset, os.SEEK_SET)
+    while offset < size and sendfile is not None:
+        if token is not None:
+            token.raise_if_cancelled()
+        try:
+            copied = sendfile(target_fd, source_fd, offset, min(CHUNK_SIZE, size - offset))
+        except OSError as e:
+            if e.errno not in FALLBACK_ERRORS:
+                raise
+            sendfile = None
+            break
+        if copied == 0:
+            return offset
+        offset += copied
+        if advance is not None:
+            advance(copied)
+
+    os.lseek(source_fd, offset, os.SEEK_SET)
+    os.lseek(target_fd, offset, os.SEEK_SET)
+    while offset < size:
+        if token is not None:
+            token.raise_if_cancelled()
+        data = os.read(source_fd, min(CHUNK_SIZE, size - offset))
+        if not data:
+            break
+        view = memoryview(data)
+        while view:
+            written = os.write(target_fd, view)
+            view = view[written:]
+        offset += len(data)
+        if advance is not None:
+            advance(len(data))
+    return offset
+
+
+def source_identity(source, source_stat):
+    return {"source": os.path.abspath(source), "size": source_stat.st_size, "mtime_ns": source_stat.st_mtime_ns}
+
+
+def discard_partial(partial):
+    # Only ever called with a name this engine created
+    for path in (partial, partial + IDENTITY_SUFFIX):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def find_partial(target, identity):
+    # (partial, bytes already copied) left by a cancelled copy of this same source into target, or None
+    folder, name = os.path.split(target)
+    prefix = f".{name}."
+    suffix = PARTIAL_SUFFIX + IDENTITY_SUFFIX
+    try:
+        with os.scandir(folder or os.curdir) as entries:
+            identity_paths = [entry.path for entry in entries
+                              if entry.name.startswith(prefix) and entry.name.endswith(suffix)
+                              and len(entry.name) - len(prefix) - len(suffix) == 32]
+    except OSError:
+        return None
+    for identity_path in identity_paths:
+        partial = identity_path[:-len(IDENTITY_SUFFIX)]
+        try:
+            with open(identity_path, encoding="utf-8") as identity_file:
+                recorded = json.load(identity_file)
+            partial_stat = os.lstat(partial)
+        except (OSError, ValueError):
+            continue
+        if recorded == identity and stat.S_ISREG(partial_stat.st_mode) and partial_stat.st_size <= identity["size"]:
+            return partial, partial_stat.st_size
+        if isinstance(recorded, dict) and recorded.get("source") == identity["source"]:
+            # Our own copy of an older version of this source; it can never be resumed
+            discard_partial(partial)
+    return None
+
+
+def copy_file(source, target, token=None, advance=None):
+    # Copy into a hidden partial file and rename it into place, so the target is never seen half written.
+    # Only partial files this engine created are ever appended to or removed.
+    source_stat = os.stat(source)
+    size = source_stat.st_size
+    identity = source_identity(source, source_stat)
+    resumable = size >= RESUME_MIN_BYTES
+
+    found = find_partial(target, identity) if resumable else None
+    if found is not None:
+        partial, offset = found
+        flags = os.O_WRONLY
+    else:
+        folder, name = os.path.split(target)
+        partial = os.path.join(folder, f".{name}.{uuid.uuid4().hex}{PARTIAL_SUFFIX}")
+        offset = 0
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+    if offset and advance is not None:
+        advance(offset)
+
+    source_fd = os.open(source, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        target_fd = os.open(partial, flags | getattr(os, "O_BINARY", 0), 0o666)
+        try:
+            if found is None and resumable:
+                with open(partial + IDENTITY_SUFFIX, "w", encoding="utf-8") as identity_file:
+                    json.dump(identity, identity_file)
+            copied = copy_data(source_fd, target_fd, size, offset, token, advance)
+        except BaseException:
+            os.close(target_fd)
+            # Large copies stay for the next paste, but only once they can be matched to their source
+            if not resumable or not os.path.exists(partial + IDENTITY_SUFFIX):
+                discard_partial(partial)
+            raise
+        os.close(target_fd)
+    finally:
+        os.close(source_fd)
+
+    if copied != size:
+        discard_partial(partial)
+        raise OSError(errno.EIO, f"{source} changed while it was being copied")
+    shutil.copystat(source, partial)
+    os.replace(partial, target)
+    if resumable:
+        discard_partial(partial)
+
+
+class TransferPlan:
+    # Everything a copy will touch, worked out before the first byte moves so progress has a real total
+    def __init__(self):
+        self.directories = []
+        self.files = []
+        self.links = []
+        self.total_bytes = 0
+        # Files left out: kept as they are under SKIP, or already copied in full by an earlier paste (never under
+        # OVERWRITE, which always copies)
+        self.kept = []
+        self.identical = []
+
+    @property
+    def skipped(self):
+        return len(self.kept) + len(self.identical)
+
+
+class TransferEngine:
+    def __init__(self, workers=None):
+        self.workers = workers or min(16, (os.cpu_count() or 1) * 2)
+
+    @staticmethod
+    def resolve_target(source, destination, policy):
+        # Top-level conflicts: RENAME picks a free name, SKIP/OVERWRITE merge folders and decide per file
+        target = os.path.join(destination, os.path.basename(os.path.normpath(source)))
+        if os.path.normcase(os.path.abspath(source)) == os.path.normcase(os.path.abspath(target)):
+            # Pasting into the folder the item came from always makes a copy next to it
+            return unique_target(target)
+        if policy == RENAME:
+            return unique_target(target)
+        return target
+
+    @staticmethod
+    def conflicts(items, destination):
+        return [item for item in items
+                if os.path.lexists(os.path.join(destination, os.path.basename(os.path.normpath(item))))]
+
+    @staticmethod
+    def check_nesting(source, target):
+        source = os.path.normcase(os.path.abspath(source))
+        target = os.path.normcase(os.path.abspath(target))
+        if target.startswith(source + os.sep):
+            raise OSError(errno.EINVAL, f"Cannot copy '{os.path.basename(source)}' into itself")
+
+    def plan(self, pairs, policy, token=None):
+        plan = TransferPlan()
+        stack = list(pairs)
+        while stack:
+            if token is not None:
+                token.raise_if_cancelled()
+            source, target = stack.pop()
+            source_stat = os.lstat(source)
+            if stat.S_ISLNK(source_stat.st_mode):
+                plan.links.append((source, target))
+            elif stat.S_ISDIR(source_stat.st_mode):
+                plan.directories.append((source, target))
+                with os.scandir(source) as entries:
+                    stack.extend((entry.path, os.path.join(target, entry.name)) for entry in entries)
+            elif policy != OVERWRITE and os.path.lexists(target) and same_file(source_stat, target):
+                plan.identical.append(source)
+            elif os.path.lexists(target) and policy == SKIP:
+                plan.kept.append(source)
+            else:
+                plan.files.append((source, target, source_stat.st_size))
+                plan.total_bytes += source_stat.st_size
+        return plan
+
+    def copy(self, items, destination, policy=RENAME, token=None, progress=None):
+        destination = os.fspath(destination)
+        started = time.perf_counter()
+        pairs = []
+        for item in items:
+            item = os.fspath(item)
+            target = self.resolve_target(item, destination, policy)
+            self.check_nesting(item, target)
+            pairs.append((item, target))
+
+        plan = self.plan(pairs, policy, token)
+        errors = self.execute(plan, token, progress)
+        return {"items": [target for _, target in pairs], "files": len(plan.files), "skipped": plan.skipped,
+                "bytes": plan.total_bytes, "errors": errors, "seconds": time.perf_counter() - started}
+
+    def move(self, items, destination, policy=RENAME, token=None, progress=None):
+        # Same filesystem: one rename per item. Across filesystems: copy, then remove what was copied.
+        destination = os.fspath(destination)
+        started = time.perf_counter()
+        moved = []
+        copied = []
+        errors = []
+        skipped = 0
+        for item in items:
+            if token is not None:
+                token.raise_if_cancelled()
+            item = os.fspath(item)
+            if os.path.normcase(os.path.abspath(os.path.dirname(item))) == \
+                    os.path.normcase(os.path.abspath(destination)):
+                skipped += 1
+                continue
+            target = self.resolve_target(item, destination, policy)
+            self.check_nesting(item, target)
+            merge = os.path.isdir(item) and os.path.isdir(target) and not os.path.islink(item)
+            try:
+                if not os.path.lexists(target):
+                    os.rename(item, target)
+                elif merge:
+                    # Folders merge into an existing folder file by file
+                    copied.append((item, target))
+                    continue
+                elif policy == OVERWRITE:
+                    os.replace(item, target)
+                else:
+                    skipped += 1
+                    continue
+                moved.append(target)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    errors.append((item, e.strerror or str(e)))
+                    continue
+                copied.append((item, target))
+
+        plan = TransferPlan()
+        if copied:
+            plan = self.plan(copied, policy, token)
+            copy_errors = self.execute(plan, token, progress)
+            errors.extend(copy_errors)
+            self._remove_sources(plan, {path for path, _ in copy_errors}, errors)
+            moved.extend(target for source, target in copied if not os.path.lexists(source))
+        return {"items": moved, "files": len(plan.files), "skipped": skipped + plan.skipped,
+                "bytes": plan.total_bytes, "errors": errors, "seconds": time.perf_counter() - started}
+
+    @staticmethod
+    def _remove_sources(plan, failed, errors):
+        # Only what arrived in full is removed; skipped and failed files keep their folders alive
+        sources = [source for source, _, _ in plan.files if source not in failed]
+        sources.extend(source for source, _ in plan.links if source not in failed)
+        sources.extend(plan.identical)
+        for source in sources:
+            try:
+                os.remove(source)
+            except OSError as e:
+                errors.append((source, e.strerror or str(e)))
+        for source, _ in reversed(plan.directories):
+            try:
+                os.rmdir(source)
+            except OSError:
+                pass
+
+    def execute(self, plan, token=None, progress=None):
+        errors = []
+        done = [0]
+        lock = threading.Lock()
+
+        def advance(amount):
+            with lock:
+                done[0] += amount
+                total_done = done[0]
+            if progress is not None:
+                progress(total_done, plan.total_bytes)
+
+        # Folders first, parents before children (the plan lists them top-down)
+        for source, target in plan.directories:
+            try:
+                os.makedirs(target, exist_ok=True)
+            except OSError as e:
+                errors.append((source, e.strerror or str(e)))
+
+        for source, target in plan.links:
+            try:
+                if os.path.lexists(target):
+                    os.remove(target)
+                os.symlink(os.readlink(source), target)
+            except OSError as e:
+                errors.append((source, e.strerror or str(e)))
+
+        def copy_one(source, target):
+            try:
+                copy_file(source, target, token, advance)
+            except OperationCancelled:
+                raise
+            except OSError as e:
+                with lock:
+                    errors.append((source, e.strerror or str(e)))
+
+        # Many small files keep a bounded number of copies in flight; each one is a few kernel calls
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            try:
+                for source, target, _ in plan.files:
+                    if token is not None:
+                        token.raise_if_cancelled()
+                    if len(pending) >= self.workers * 4:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            future.result()
+                    pending.add(pool.submit(copy_one, source, target))
+                for future in pending:
+                    future.result()
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+        # Folder timestamps last, deepest first, since copying into a folder moves its mtime
+        for source, target in reversed(plan.directories):
+            try:
+                shutil.copystat(source, target)
+            except OSError:
+                pass
+
+        if progress is not None:
+            progress(done[0], plan.total_bytes)
+        return errors
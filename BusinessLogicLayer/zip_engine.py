@@ -0,0 +1,325 @@
+import hashlib
+import hmac
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Event
+
+from CommonLayer.app_paths import sibling_temp_file
+from CommonLayer.cancel_token import OperationCancelled
+
+CHUNK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+
+# Members larger than this are compressed into a spool file instead of being returned through the pipe
+SPOOL_THRESHOLD = 8 * 1024 * 1024
+# Small files are grouped into one task up to this many bytes so tiny members do not pay per-task overhead
+TASK_BYTES = 4 * 1024 * 1024
+# Below this total a process pool costs more than it saves
+PARALLEL_THRESHOLD = 16 * 1024 * 1024
+
+ZIP_DEFLATED = 8
+ZIP_AES = 99
+ZIP64_LIMIT = 0xFFFFFFFF
+AES_SALT_SIZE = 16
+AES_KEY_SIZE = 32
+AES_MAC_SIZE = 10
+AES_ITERATIONS = 1000
+
+# Set by the pool initializer; lets the parent stop members that are mid-compression
+_worker_cancel = None
+
+
+def _init_worker(cancel_event):
+    global _worker_cancel
+    _worker_cancel = cancel_event
+
+
+class AesEncrypter:
+    # WinZip AE-2 encryption: PBKDF2-SHA1 keys, AES-256 in little-endian CTR mode, HMAC-SHA1 over the ciphertext
+    def __init__(self, password):
+        from Cryptodome.Cipher import AES
+        from Cryptodome.Util import Counter
+
+        self.salt = os.urandom(AES_SALT_SIZE)
+        keys = hashlib.pbkdf2_hmac("sha1", password, self.salt, AES_ITERATIONS, 2 * AES_KEY_SIZE + 2)
+        self.verifier = keys[2 * AES_KEY_SIZE:]
+        self.cipher = AES.new(keys[:AES_KEY_SIZE], AES.MODE_CTR,
+                              counter=Counter.new(nbits=128, little_endian=True))
+        self.mac = hmac.new(keys[AES_KEY_SIZE:2 * AES_KEY_SIZE], digestmod=hashlib.sha1)
+
+    def header(self):
+        return self.salt + self.verifier
+
+    def encrypt(self, data):
+        data = self.cipher.encrypt(data)
+        self.mac.update(data)
+        return data
+
+    def footer(self):
+        return self.mac.digest()[:AES_MAC_SIZE]
+
+
+def compress_member(path, password=None, spool_path=None):
+    # Deflate (and encrypt) one file chunk by chunk; returns the member's sizes and compressed stream
+    crc = 0
+    file_size = 0
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    encrypter = AesEncrypter(password) if password else None
+
+    out = open(spool_path, "wb") if spool_path else None
+    parts = []
+    write = out.write if out else parts.append
+    compress_size = 0
+
+    try:
+        if encrypter:
+            write(encrypter.header())
+            compress_size += AES_SALT_SIZE + 2
+        with open(path, "rb") as source:
+            while True:
+                if _worker_cancel is not None and _worker_cancel.is_set():
+                    raise OperationCancelled()
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                crc = zlib.crc32(chunk, crc)
+                data = compressor.compress(chunk)
+                if data:
+                    if encrypter:
+                        data = encrypter.encrypt(data)
+                    write(data)
+                    compress_size += len(data)
+        data = compressor.flush()
+        if encrypter:
+            data = encrypter.encrypt(data) + encrypter.footer()
+        write(data)
+        compress_size += len(data)
+    finally:
+        if out:
+            out.close()
+
+    return {"crc": crc, "file_size": file_size, "compress_size": compress_size, "encrypted": bool(encrypter),
+            "data": None if spool_path else b"".join(parts), "spool_path": spool_path}
+
+
+def compress_task(members, password):
+    # One pool task: a run of small files, or a single large file spooled to disk
+    return [compress_member(path, password, spool_path) for path, spool_path in members]
+
+
+def dos_datetime(timestamp):
+    date_time = time.localtime(max(timestamp, 315532800))
+    dos_date = (date_time.tm_year - 1980) << 9 | date_time.tm_mon << 5 | date_time.tm_mday
+    dos_time = date_time.tm_hour << 11 | date_time.tm_min << 5 | date_time.tm_sec // 2
+    return dos_time, dos_date
+
+
+class ZipMember:
+    __slots__ = ("path", "arcname", "size", "mtime", "mode", "offset", "result")
+
+    def __init__(self, path, arcname, size, mtime, mode):
+        self.path = path
+        self.arcname = arcname
+        self.size = size
+        self.mtime = mtime
+        self.mode = mode
+        self.offset = 0
+        self.result = None
+
+
+class ZipEngine:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+
+    @staticmethod
+    def collect_members(items, base_dir):
+        # Same layout as before: files inside selected folders are stored relative to `base_dir`,
+        # selected files by name only
+        paths = []
+        for item in items:
+            item = os.fspath(item)
+            if os.path.isdir(item):
+                for directory, dirs, files in os.walk(item):
+                    dirs.sort()
+                    paths.extend((os.path.join(directory, name), None) for name in sorted(files))
+            else:
+                paths.append((item, os.path.basename(item)))
+
+        members = []
+        for path, arcname in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if arcname is None:
+                arcname = os.path.relpath(path, base_dir)
+            members.append(ZipMember(path, arcname.replace(os.sep, "/"), stat.st_size, stat.st_mtime, stat.st_mode))
+        return members
+
+    def create(self, zip_path, items, base_dir, password=None, token=None, progress=None):
+        zip_path = os.fspath(zip_path)
+        password = password.encode("utf-8") if isinstance(password, str) and password else None
+        members = self.collect_members(items, base_dir)
+        total_bytes = sum(member.size for member in members)
+
+        spool_dir = tempfile.mkdtemp(prefix=".zip-", dir=os.path.dirname(zip_path) or ".")
+        cancel_event = Event()
+        started = time.perf_counter()
+
+        partial_fd, partial_path = sibling_temp_file(zip_path)
+        try:
+            with os.fdopen(partial_fd, "wb") as archive:
+                tasks = self._plan_tasks(members, spool_dir)
+                if total_bytes < PARALLEL_THRESHOLD or self.workers == 1:
+                    results = (compress_task([(m.path, spool) for m, spool in task], password) for task in tasks)
+                    self._write_members(archive, tasks, results, total_bytes, token, progress)
+                else:
+                    with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)), initializer=_init_worker,
+                                             initargs=(cancel_event,)) as pool:
+                        try:
+                            results = self._ordered_results(pool, tasks, password)
+                            self._write_members(archive, tasks, results, total_bytes, token, progress)
+                        except BaseException:
+                            cancel_event.set()
+                            pool.shutdown(wait=True, cancel_futures=True)
+                            raise
+                self._write_central_directory(archive, members)
+            os.replace(partial_path, zip_path)
+        except BaseException:
+            # Cancelled or failed: never leave a truncated archive behind
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
+            raise
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+        return {"members": len(members), "bytes_in": total_bytes, "bytes_out": os.path.getsize(zip_path),
+                "seconds": time.perf_counter() - started}
+
+    @staticmethod
+    def _plan_tasks(members, spool_dir):
+        tasks = []
+        current = []
+        current_bytes = 0
+        for index, member in enumerate(members):
+            if member.size > SPOOL_THRESHOLD:
+                tasks.append([(member, os.path.join(spool_dir, str(index)))])
+                continue
+            current.append((member, None))
+            current_bytes += member.size
+            if current_bytes >= TASK_BYTES:
+                tasks.append(current)
+                current = []
+                current_bytes = 0
+        if current:
+            tasks.append(current)
+        return tasks
+
+    def _ordered_results(self, pool, tasks, password):
+        # Keep a bounded window of tasks in flight and yield their results in archive order
+        window = self.workers * 2
+        futures = []
+        next_task = 0
+        for index in range(len(tasks)):
+            while next_task < len(tasks) and next_task < index + window:
+                members = [(member.path, spool) for member, spool in tasks[next_task]]
+                futures.append(pool.submit(compress_task, members, password))
+                next_task += 1
+            yield futures[index].result()
+            futures[index] = None
+
+    def _write_members(self, archive, tasks, results, total_bytes, token, progress):
+        done_bytes = 0
+        reported_at = 0
+        for task, task_results in zip(tasks, results):
+            for (member, _), result in zip(task, task_results):
+                if token is not None:
+                    token.raise_if_cancelled()
+                member.result = result
+                member.offset = archive.tell()
+                archive.write(self._local_header(member))
+                if result["spool_path"]:
+                    with open(result["spool_path"], "rb") as spool:
+                        shutil.copyfileobj(spool, archive, CHUNK_SIZE)
+                    os.remove(result["spool_path"])
+                else:
+                    archive.write(result["data"])
+                result["data"] = None
+
+                done_bytes += member.size
+                if progress is not None and time.perf_counter() - reported_at >= 0.1:
+                    progress(done_bytes, total_bytes)
+                    reported_at = time.perf_counter()
+        if progress is not None:
+            progress(done_bytes, total_bytes)
+
+    @staticmethod
+    def _member_fields(member):
+        # (version, flags, method, crc, extra) shared by the local header and the central directory record
+        flags = 0 if member.arcname.isascii() else 0x800
+        if not member.result["encrypted"]:
+            return 20, flags, ZIP_DEFLATED, member.result["crc"], b""
+        # AE-2 stores no CRC; the extra field records vendor "AE", AES-256 and the real method (deflate)
+        extra = struct.pack("<HHH2sBH", 0x9901, 7, 2, b"AE", 3, ZIP_DEFLATED)
+        return 51, flags | 0x1, ZIP_AES, 0, extra
+
+    def _local_header(self, member):
+        version, flags, method, crc, extra = self._member_fields(member)
+        name = member.arcname.encode("utf-8")
+
+        compress_size, file_size = member.result["compress_size"], member.result["file_size"]
+        if compress_size >= ZIP64_LIMIT or file_size >= ZIP64_LIMIT:
+            extra = struct.pack("<HHQQ", 0x0001, 16, file_size, compress_size) + extra
+            compress_size = file_size = ZIP64_LIMIT
+            version = max(version, 45)
+
+        dos_time, dos_date = dos_datetime(member.mtime)
+        return struct.pack("<IHHHHHIIIHH", 0x04034b50, version, flags, method, dos_time, dos_date, crc,
+                           compress_size, file_size, len(name), len(extra)) + name + extra
+
+    def _write_central_directory(self, archive, members):
+        start = archive.tell()
+        create_system = 0 if os.name == "nt" else 3
+        for member in members:
+            result = member.result
+            version, flags, method, crc, extra = self._member_fields(member)
+            name = member.arcname.encode("utf-8")
+
+            zip64 = []
+            file_size, compress_size, offset = result["file_size"], result["compress_size"], member.offset
+            if file_size >= ZIP64_LIMIT:
+                zip64.append(file_size)
+                file_size = ZIP64_LIMIT
+            if compress_size >= ZIP64_LIMIT:
+                zip64.append(compress_size)
+                compress_size = ZIP64_LIMIT
+            if offset >= ZIP64_LIMIT:
+                zip64.append(offset)
+                offset = ZIP64_LIMIT
+            if zip64:
+                extra = struct.pack("<HH" + "Q" * len(zip64), 0x0001, 8 * len(zip64), *zip64) + extra
+                version = max(version, 45)
+
+            dos_time, dos_date = dos_datetime(member.mtime)
+            archive.write(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014b50, create_system << 8 | version, version,
+                                      flags, method, dos_time, dos_date, crc, compress_size, file_size, len(name),
+                                      len(extra), 0, 0, 0, (member.mode & 0xFFFF) << 16, offset) + name + extra)
+
+        size = archive.tell() - start
+        count = len(members)
+        if count >= 0xFFFF or size >= ZIP64_LIMIT or start >= ZIP64_LIMIT:
+            zip64_end = archive.tell()
+            archive.write(struct.pack("<IQHHIIQQQQ", 0x06064b50, 44, 45, 45, 0, 0, count, count, size, start))
+            archive.write(struct.pack("<IIQI", 0x07064b50, 0, zip64_end, 1))
+            count = min(count, 0xFFFF)
+            size = min(size, ZIP64_LIMIT)
+            start = min(start, ZIP64_LIMIT)
+        archive.write(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, count, count, size, start, 0))
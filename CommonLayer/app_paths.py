@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+APP_NAME = "FileExplorer"
+# Read once at import; os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def cache_dir(*parts):
+    # Per-user cache location following each platform's convention
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+    path = os.path.join(base, APP_NAME, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def sibling_temp_file(path):
+    # A new hidden file next to `path`, to be os.replace()d onto it once complete: (fd, temp_path).
+    # The name is unique, so no existing file is ever truncated; permissions are those a plain open() would give.
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or os.curdir, prefix=".")
+    try:
+        os.chmod(temp_path, 0o666 & ~UMASK)
+    except OSError:
+        pass
+    return fd, temp_path
@@ -0,0 +1,40 @@
+import os
+import stat as stat_module
+
+
+class FileEntry:
+    __slots__ = ("name", "path", "is_dir", "size", "modified", "created")
+
+    def __init__(self, name, path, is_dir, size, modified, created):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.size = size
+        self.modified = modified
+        self.created = created
+
+    @property
+    def suffix(self):
+        return os.path.splitext(self.name)[1]
+
+    @classmethod
+    def from_dir_entry(cls, entry):
+        # DirEntry.is_dir() comes from the directory read itself, so stat() is the only syscall per entry
+        is_dir = entry.is_dir()
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            # Dangling symlink: describe the link itself
+            stat = entry.stat(follow_symlinks=False)
+        return cls(entry.name, entry.path, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime, stat.st_ctime)
+
+    @classmethod
+    def from_path(cls, path):
+        path = os.fspath(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Dangling symlink: describe the link itself
+            stat = os.lstat(path)
+        is_dir = stat_module.S_ISDIR(stat.st_mode)
+        return cls(os.path.basename(path), path, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime, stat.st_ctime)
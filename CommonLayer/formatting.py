@@ -0,0 +1,26 @@
+import time
+
+DATE_FORMAT = "%d/%m/%Y %I:%M %p"
+
+
+def format_size(size):
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024 ** 2:
+        return f"{size / 1024:.2f} KB"
+    elif size < 1024 ** 3:
+        return f"{size / 1024 ** 2:.2f} MB"
+    else:
+        return f"{size / 1024 ** 3:.2f} GB"
+
+
+def format_timestamp(timestamp):
+    return time.strftime(DATE_FORMAT, time.localtime(timestamp))
+
+
+def format_row(entry, full_path=False):
+    # Values in the column order of the file pane: Name, Date Modified, Date Created, Type, Size
+    item_type = "Folder" if entry.is_dir else entry.suffix
+    item_size = "" if entry.is_dir else format_size(entry.size)
+    name = entry.path if full_path else entry.name
+    return (name, format_timestamp(entry.modified), format_timestamp(entry.created), item_type, item_size)
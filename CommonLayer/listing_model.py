@@ -0,0 +1,223 @@
+import os
+from array import array
+
+from CommonLayer.file_entry import FileEntry
+from CommonLayer.formatting import format_row, format_size
+
+COLUMNS = ("Name", "Date Modified", "Date Created", "Type", "Size")
+
+
+class ListingModel:
+    # Column-oriented listing: raw sizes and timestamps live in typed arrays, one slot per row id.
+    # `order` maps display positions to row ids; display strings are only produced for rows in view.
+    COMPACT_MIN_DEAD = 1024
+
+    def __init__(self, full_path=False):
+        # Search results come from many folders, so their Name column shows the full path
+        self.full_path = full_path
+        self.paths = []
+        self.names = []
+        self.name_keys = []
+        self.type_keys = []
+        self.is_dir = bytearray()
+        self.sizes = array("q")
+        self.modified = array("d")
+        self.created = array("d")
+
+        # Folders whose recursive size has been measured; their Size cell is shown like a file's
+        self.measured = set()
+        # Per-row text shown in the Type column instead of the extension (e.g. the duplicate set of a file)
+        self.labels = {}
+
+        self.order = []
+        self.rows = {}
+        self.positions = {}
+        self.sort_column = None
+        self.descending = False
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, path):
+        return path in self.rows
+
+    def _store(self, entry):
+        row = self.rows.get(entry.path)
+        suffix = "" if entry.is_dir else os.path.splitext(entry.name)[1].lower()
+        if row is None:
+            row = len(self.paths)
+            self.paths.append(entry.path)
+            self.names.append(entry.name)
+            self.name_keys.append(entry.name.casefold())
+            self.type_keys.append(suffix)
+            self.is_dir.append(1 if entry.is_dir else 0)
+            self.sizes.append(entry.size)
+            self.modified.append(entry.modified)
+            self.created.append(entry.created)
+            self.rows[entry.path] = row
+            return row, True
+
+        self.names[row] = entry.name
+        self.name_keys[row] = entry.name.casefold()
+        self.type_keys[row] = suffix
+        self.is_dir[row] = 1 if entry.is_dir else 0
+        self.sizes[row] = entry.size
+        self.modified[row] = entry.modified
+        self.created[row] = entry.created
+        return row, False
+
+    def extend(self, entries, labels=None):
+        # Returns the display position of the first row that moved, or None when nothing was added
+        start = len(self.order)
+        for entry in entries:
+            row, added = self._store(entry)
+            if labels and entry.path in labels:
+                self.labels[row] = labels[entry.path]
+                self.type_keys[row] = labels[entry.path].lower()
+            if added:
+                self.order.append(row)
+                self.positions[entry.path] = len(self.order) - 1
+        if len(self.order) == start:
+            return None
+        if self.sort_column is not None:
+            # Timsort merges the appended run into the already sorted rows in close to linear time
+            self._sort()
+            return 0
+        return start
+
+    def upsert(self, entry):
+        # Returns (display position, added); updated rows are moved to keep the sort order
+        row, added = self._store(entry)
+        if added:
+            position = self._insertion_point(row)
+            self.order.insert(position, row)
+            self._reindex(position)
+            return position, True
+        self.measured.discard(row)
+        return self._reposition(row), False
+
+    def set_size(self, path, size):
+        # Recursive folder size from the disk-usage engine; returns the row's new display position
+        row = self.rows.get(path)
+        if row is None:
+            return None
+        self.sizes[row] = size
+        self.measured.add(row)
+        return self._reposition(row)
+
+    def _reposition(self, row):
+        start = self.positions[self.paths[row]]
+        if self.sort_column is None:
+            return start
+        self._remove_position(start)
+        position = self._insertion_point(row)
+        self.order.insert(position, row)
+        self._reindex(min(start, position))
+        return position
+
+    def remove(self, paths):
+        # Returns the lowest display position that changed, or None
+        positions = sorted((self.positions[path] for path in paths if path in self.positions), reverse=True)
+        for position in positions:
+            row = self.order[position]
+            del self.rows[self.paths[row]]
+            self.measured.discard(row)
+            self.labels.pop(row, None)
+            self._remove_position(position)
+        if not positions:
+            return None
+        self._reindex(positions[-1])
+        if len(self.paths) - len(self.order) >= max(self.COMPACT_MIN_DEAD, len(self.order)):
+            self.compact()
+        return positions[-1]
+
+    def _remove_position(self, position):
+        row = self.order.pop(position)
+        self.positions.pop(self.paths[row], None)
+
+    def compact(self):
+        # Drop the slots of removed rows once they outnumber the live ones
+        rows = [(self._entry(row), row in self.measured, self.labels.get(row)) for row in self.order]
+        sort_column, descending = self.sort_column, self.descending
+        self.__init__(self.full_path)
+        self.sort_column, self.descending = sort_column, descending
+        for entry, measured, label in rows:
+            row, _ = self._store(entry)
+            self.order.append(row)
+            if measured:
+                self.measured.add(row)
+            if label is not None:
+                self.labels[row] = label
+                self.type_keys[row] = label.lower()
+        self._reindex(0)
+
+    def _reindex(self, start):
+        paths = self.paths
+        for position in range(start, len(self.order)):
+            self.positions[paths[self.order[position]]] = position
+
+    def _key(self, column):
+        if column == "Name":
+            return self.name_keys.__getitem__
+        if column == "Date Modified":
+            return self.modified.__getitem__
+        if column == "Date Created":
+            return self.created.__getitem__
+        if column == "Type":
+            return self.type_keys.__getitem__
+        return self.sizes.__getitem__
+
+    def sort(self, column, descending=False):
+        self.sort_column = column
+        self.descending = descending
+        self._sort()
+
+    def _sort(self):
+        # Stable: rows with equal keys keep their previous relative order, which gives multi-key ordering
+        self.order.sort(key=self._key(self.sort_column), reverse=self.descending)
+        self._reindex(0)
+
+    def _insertion_point(self, row):
+        if self.sort_column is None:
+            return len(self.order)
+        key = self._key(self.sort_column)
+        value = key(row)
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            other = key(self.order[middle])
+            if (value > other) if self.descending else (value < other):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def folder_paths(self):
+        return [self.paths[row] for row in self.order if self.is_dir[row]]
+
+    def position(self, path):
+        return self.positions.get(path)
+
+    def path_at(self, position):
+        return self.paths[self.order[position]]
+
+    def entry(self, path):
+        row = self.rows.get(path)
+        return None if row is None else self._entry(row)
+
+    def entry_at(self, position):
+        return self._entry(self.order[position])
+
+    def _entry(self, row):
+        return FileEntry(self.names[row], self.paths[row], bool(self.is_dir[row]), self.sizes[row],
+                         self.modified[row], self.created[row])
+
+    def values_at(self, position):
+        # Formatted lazily, only for rows that are about to be shown
+        row = self.order[position]
+        values = format_row(self._entry(row), self.full_path)
+        if row in self.labels:
+            values = values[:3] + (self.labels[row],) + values[4:]
+        if row in self.measured:
+            values = values[:4] + (format_size(self.sizes[row]),)
+        return values
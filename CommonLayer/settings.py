@@ -0,0 +1,35 @@
+# Tunables shared by the data access, business logic and presentation layers
+
+# Upper bound on the memory held by cached directory listings
+LISTING_CACHE_BUDGET_BYTES = 64 * 1024 * 1024
+
+# Searches stop after this many hits so a query matching millions of files stays bounded
+SEARCH_RESULT_CAP = 20000
+
+# Quiet time after the last keystroke before a live search starts
+SEARCH_DEBOUNCE_MS = 250
+
+# Pseudo filesystems the filename index never descends into
+INDEX_EXCLUDED_PATHS = ("/proc", "/sys", "/dev", "/run")
+
+# Extraction guards against zip bombs
+EXTRACT_MAX_MEMBER_BYTES = 16 * 1024 ** 3
+EXTRACT_MAX_TOTAL_BYTES = 64 * 1024 ** 3
+EXTRACT_MAX_RATIO = 200
+
+# Hidden folder, next to deleted items, that holds them while they are being removed
+DELETE_STAGING_NAME = ".fileexplorer-deleting"
+
+# A drive whose root cannot be listed within this time is shown as not responding
+MOUNT_TIMEOUT_SECONDS = 3.0
+
+# Folder records kept by the disk-usage cache before it starts over
+DISK_USAGE_CACHE_DIRS = 500000
+
+# Preview pane: longest thumbnail side, text head size, memory for decoded thumbnails and selection debounce
+PREVIEW_THUMBNAIL_SIZE = 256
+PREVIEW_TEXT_BYTES = 64 * 1024
+THUMBNAIL_CACHE_BUDGET_BYTES = 48 * 1024 * 1024
+# Keep thumbnails on disk between sessions as well
+THUMBNAIL_DISK_CACHE = True
+PREVIEW_DEBOUNCE_MS = 60
@@ -0,0 +1,19 @@
+import json
+import os
+import time
+
+# main.py imports this module first, so the measurement covers every later import
+STARTED_AT = time.perf_counter()
+
+
+def elapsed_ms():
+    return (time.perf_counter() - STARTED_AT) * 1000
+
+
+def record_startup(milliseconds, log_dir):
+    # One JSON line per launch, so cold-start regressions show up over time
+    try:
+        with open(os.path.join(log_dir, "startup_times.jsonl"), "a", encoding="utf-8") as log:
+            log.write(json.dumps({"at": time.time(), "startup_ms": round(milliseconds, 1)}) + "\n")
+    except OSError:
+        pass
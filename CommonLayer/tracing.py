@@ -0,0 +1,94 @@
+import functools
+import json
+import os
+import threading
+import time
+
+# FILEEXPLORER_TRACE=/path/trace.json records operation timings as Chrome trace events (chrome://tracing, Perfetto)
+TRACE_PATH = os.environ.get("FILEEXPLORER_TRACE")
+
+
+class Tracer:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+
+    def write(self, name, started, finished, thread, args):
+        # "X" (complete) events; the closing "]" is optional in the format, so a crash never loses earlier events
+        event = {"name": name, "cat": "operation", "ph": "X", "ts": round(started * 1e6, 1),
+                 "dur": round((finished - started) * 1e6, 1), "pid": os.getpid(), "tid": thread, "args": args}
+        line = json.dumps(event, default=str) + ",\n"
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, "w", encoding="utf-8")
+                self.file.write("[\n")
+            self.file.write(line)
+            self.file.flush()
+
+
+class Span:
+    # One operation, from begin() until end(); an asynchronous operation may end on another thread
+    __slots__ = ("tracer", "name", "args", "started", "thread")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.started = time.perf_counter()
+        self.thread = threading.get_ident()
+
+    def end(self, **args):
+        tracer, self.tracer = self.tracer, None
+        if tracer is not None:
+            self.args.update(args)
+            tracer.write(self.name, self.started, time.perf_counter(), self.thread, self.args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        if error_type is None:
+            self.end()
+        else:
+            self.end(error=error_type.__name__)
+        return False
+
+
+class NullSpan:
+    # Returned while tracing is off, so call sites never need to check
+    def end(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        return False
+
+
+_tracer = Tracer(TRACE_PATH) if TRACE_PATH else None
+NULL_SPAN = NullSpan()
+
+
+def enabled():
+    return _tracer is not None
+
+
+def begin(name, **args):
+    return Span(_tracer, name, args) if _tracer is not None else NULL_SPAN
+
+
+def traced(name=None):
+    # Times each call of a method; with tracing off the method is returned untouched
+    def decorate(function):
+        if _tracer is None:
+            return function
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(_tracer, span_name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
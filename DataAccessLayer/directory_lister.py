@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+
+from CommonLayer import settings
+from CommonLayer.cancel_token import CancelToken, OperationCancelled
+from CommonLayer.file_entry import FileEntry
+from DataAccessLayer.zip_browser import split_archive_path
+
+
+# Internal bookkeeping folders that never show up in listings
+HIDDEN_NAMES = frozenset((settings.DELETE_STAGING_NAME,))
+
+
+def list_subfolders(path):
+    # Folders, and zip archives browsed as folders, judged from DirEntry type info without a stat per entry
+    with os.scandir(path) as entries:
+        return [(entry.name, entry.path) for entry in entries
+                if entry.name not in HIDDEN_NAMES
+                and (entry.is_dir() or (entry.name.lower().endswith(".zip") and entry.is_file()))]
+
+
+class DirectoryLister:
+    # The first batch is kept small so the first screenful appears immediately
+    FIRST_BATCH_SIZE = 64
+    BATCH_SIZE = 2000
+    BATCH_INTERVAL = 0.05
+
+    def __init__(self, post, cache=None, zip_browser=None):
+        # `post(callback, *args)` must run the callback on the UI thread
+        self.post = post
+        self.cache = cache
+        self.zip_browser = zip_browser
+        self.current_token = None
+
+    def list_async(self, path, on_batch, on_done, on_error):
+        # A newer listing always supersedes the one still running
+        self.cancel()
+        token = CancelToken()
+        self.current_token = token
+
+        worker = threading.Thread(target=self._run, args=(path, token, on_batch, on_done, on_error), daemon=True)
+        worker.start()
+        return token
+
+    def cancel(self):
+        if self.current_token is not None:
+            self.current_token.cancel()
+            self.current_token = None
+
+    def _run(self, path, token, on_batch, on_done, on_error):
+        try:
+            if self.zip_browser is not None and split_archive_path(path) is not None:
+                # Folders inside an archive are listed from its central directory
+                self.post(self._deliver, token, on_batch, self.zip_browser.list(path))
+            else:
+                cached = self.cache.get(path) if self.cache is not None else None
+                if cached is not None:
+                    self.post(self._deliver, token, on_batch, cached)
+                else:
+                    self._read(path, token, on_batch)
+        except OperationCancelled:
+            return
+        except Exception as e:
+            # OSError from the filesystem, or a damaged archive
+            self.post(self._deliver, token, on_error, e)
+            return
+        self.post(self._deliver, token, on_done)
+
+    def _read(self, path, token, on_batch):
+        stamp = self.cache.directory_stamp(path) if self.cache is not None else None
+        entries = []
+        for batch in self.iter_batches(path, token):
+            entries.extend(batch)
+            self.post(self._deliver, token, on_batch, batch)
+        if self.cache is not None:
+            self.cache.put(path, stamp, entries)
+
+    @staticmethod
+    def _deliver(token, callback, *args):
+        # Results of a cancelled listing may still be queued; drop them
+        if not token.cancelled:
+            callback(*args)
+
+    @staticmethod
+    def iter_entries(path, token=None):
+        with os.scandir(path) as entries:
+            for dir_entry in entries:
+                if token is not None:
+                    token.raise_if_cancelled()
+                if dir_entry.name in HIDDEN_NAMES:
+                    continue
+                try:
+                    yield FileEntry.from_dir_entry(dir_entry)
+                except OSError:
+                    # The entry vanished or cannot be stat'ed; skip it rather than failing the listing
+                    continue
+
+    def iter_batches(self, path, token=None):
+        batch = []
+        limit = self.FIRST_BATCH_SIZE
+        flushed_at = time.perf_counter()
+        for entry in self.iter_entries(path, token):
+            batch.append(entry)
+            if len(batch) >= limit or time.perf_counter() - flushed_at >= self.BATCH_INTERVAL:
+                yield batch
+                batch = []
+                limit = self.BATCH_SIZE
+                flushed_at = time.perf_counter()
+        if batch:
+            yield batch
@@ -0,0 +1,211 @@
+import os
+import sqlite3
+import threading
+import time
+
+from CommonLayer import settings
+from CommonLayer.app_paths import cache_dir
+from CommonLayer.cancel_token import OperationCancelled
+from DataAccessLayer.directory_lister import HIDDEN_NAMES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY,
+    built_at REAL NOT NULL,
+    build_seconds REAL NOT NULL,
+    entries INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    parent_id INTEGER,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    rname TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir_id);
+CREATE INDEX IF NOT EXISTS files_rname ON files (rname);
+"""
+
+# Trigram full-text table kept in sync with `files` by triggers; needs SQLite 3.34+
+TRIGRAM_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5 (name, content='files', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO names (rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    INSERT INTO names (names, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+"""
+
+# Highest code point, used as the exclusive upper bound of prefix range scans
+MAX_CHAR = "\U0010ffff"
+
+
+class FilenameIndex:
+    COMMIT_EVERY = 500
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(cache_dir(), "filename_index.sqlite3")
+        self.local = threading.local()
+        self.build_lock = threading.Lock()
+
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        try:
+            connection.executescript(TRIGRAM_SCHEMA)
+            self.has_trigrams = True
+        except sqlite3.OperationalError:
+            self.has_trigrams = False
+
+    def _connection(self):
+        # sqlite3 connections are bound to their thread; WAL lets searches read while a build writes
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    @staticmethod
+    def _prefix(path):
+        return path if path.endswith(os.sep) else path + os.sep
+
+    def indexed_root(self, folder):
+        # The indexed root that contains `folder`, if any
+        folder = os.path.abspath(folder)
+        for (root,) in self._connection().execute("SELECT path FROM roots"):
+            if folder == root or folder.startswith(self._prefix(root)):
+                return root
+        return None
+
+    def search(self, folder, term, limit=settings.SEARCH_RESULT_CAP):
+        # Same semantics as the live search: "*ext" matches name endings, anything else is a substring
+        folder = os.path.abspath(folder)
+        prefix = self._prefix(folder)
+        term = term.lower()
+        scope = "(d.path = ? OR (d.path >= ? AND d.path < ?))"
+        scope_args = (folder, prefix, prefix + MAX_CHAR)
+
+        if term.startswith("*"):
+            suffix = term[1:][::-1]
+            query = (f"SELECT d.path, f.name FROM files f JOIN dirs d ON d.id = f.dir_id "
+                     f"WHERE f.rname >= ? AND f.rname < ? AND {scope} LIMIT ?")
+            args = (suffix, suffix + MAX_CHAR) + scope_args + (limit,)
+        elif self.has_trigrams and len(term) >= 3:
+            query = (f"SELECT d.path, f.name FROM names JOIN files f ON f.id = names.rowid "
+                     f"JOIN dirs d ON d.id = f.dir_id WHERE names MATCH ? AND {scope} LIMIT ?")
+            args = ('"' + term.replace('"', '""') + '"',) + scope_args + (limit,)
+        else:
+            # Too short for trigrams: scan names, still only inside the folder's subtree
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            query = (f"SELECT d.path, f.name FROM files f JOIN dirs d ON d.id = f.dir_id "
+                     f"WHERE {scope} AND lower(f.name) LIKE ? ESCAPE '\\' LIMIT ?")
+            args = scope_args + (pattern, limit)
+
+        return [os.path.join(directory, name) for directory, name in self._connection().execute(query, args)]
+
+    def update(self, root, token=None):
+        # Incremental: every directory is stat'ed, but only those whose mtime changed are re-read
+        root = os.path.abspath(root)
+        with self.build_lock:
+            started = time.perf_counter()
+            connection = self._connection()
+            prefix = self._prefix(root)
+
+            known = {}
+            children = {}
+            for dir_id, path, parent_id, mtime_ns in connection.execute(
+                    "SELECT id, path, parent_id, mtime_ns FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                    (root, prefix, prefix + MAX_CHAR)):
+                known[path] = (dir_id, mtime_ns)
+                children.setdefault(parent_id, []).append(path)
+
+            seen = set()
+            pending = 0
+            stack = [(root, None)]
+            while stack:
+                if token is not None and token.cancelled:
+                    connection.commit()
+                    raise OperationCancelled()
+
+                path, parent_id = stack.pop()
+                if path != root and (path in settings.INDEX_EXCLUDED_PATHS or os.path.basename(path) in HIDDEN_NAMES):
+                    # Staging folders already indexed by an older build are dropped with the vanished directories
+                    continue
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(path)
+
+                row = known.get(path)
+                if row is not None and row[1] == mtime_ns:
+                    # Unchanged directory: its subdirectories are already known to the index
+                    stack.extend((child, row[0]) for child in children.get(row[0], ()))
+                    continue
+
+                dir_id = self._rescan(connection, path, parent_id, mtime_ns, row, stack)
+                if dir_id is None:
+                    continue
+                pending += 1
+                if pending >= self.COMMIT_EVERY:
+                    connection.commit()
+                    pending = 0
+
+            # Directories that disappeared since the last build
+            for path, (dir_id, _) in known.items():
+                if path not in seen:
+                    connection.execute("DELETE FROM files WHERE dir_id = ?", (dir_id,))
+                    connection.execute("DELETE FROM dirs WHERE id = ?", (dir_id,))
+
+            entries = connection.execute(
+                "SELECT count(*) FROM files f JOIN dirs d ON d.id = f.dir_id "
+                "WHERE d.path = ? OR (d.path >= ? AND d.path < ?)", (root, prefix, prefix + MAX_CHAR)).fetchone()[0]
+            build_seconds = time.perf_counter() - started
+            connection.execute("INSERT OR REPLACE INTO roots (path, built_at, build_seconds, entries) "
+                               "VALUES (?, ?, ?, ?)", (root, time.time(), build_seconds, entries))
+            connection.commit()
+            return build_seconds, entries
+
+    @staticmethod
+    def _rescan(connection, path, parent_id, mtime_ns, row, stack):
+        try:
+            with os.scandir(path) as iterator:
+                # The app's own hidden folders (items being deleted) are neither indexed nor entered
+                listing = [(entry.name, entry.is_dir(follow_symlinks=False), entry.path) for entry in iterator
+                           if entry.name not in HIDDEN_NAMES]
+        except OSError:
+            return None
+
+        if row is None:
+            dir_id = connection.execute("INSERT INTO dirs (path, parent_id, mtime_ns) VALUES (?, ?, ?)",
+                                        (path, parent_id, mtime_ns)).lastrowid
+        else:
+            dir_id = row[0]
+            connection.execute("UPDATE dirs SET mtime_ns = ?, parent_id = ? WHERE id = ?",
+                               (mtime_ns, parent_id, dir_id))
+            connection.execute("DELETE FROM files WHERE dir_id = ?", (dir_id,))
+
+        connection.executemany("INSERT INTO files (dir_id, name, rname) VALUES (?, ?, ?)",
+                               ((dir_id, name, name.lower()[::-1]) for name, _, _ in listing))
+        stack.extend((child_path, dir_id) for _, is_dir, child_path in listing if is_dir)
+        return dir_id
+
+    def stats(self):
+        connection = self._connection()
+        roots = [{"path": path, "built_at": built_at, "build_seconds": build_seconds, "entries": entries}
+                 for path, built_at, build_seconds, entries in
+                 connection.execute("SELECT path, built_at, build_seconds, entries FROM roots")]
+        size = 0
+        for suffix in ("", "-wal"):
+            try:
+                size += os.path.getsize(self.db_path + suffix)
+            except OSError:
+                pass
+        return {"size_bytes": size, "roots": roots}
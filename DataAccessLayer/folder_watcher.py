@@ -0,0 +1,261 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from CommonLayer.file_entry import FileEntry
+from DataAccessLayer.directory_lister import HIDDEN_NAMES
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    # Linux kernel notifications through libc, no third-party package needed
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        self.paths = {}
+
+    def add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {path}")
+        self.watches[wd] = path
+        self.paths[path] = wd
+
+    def remove(self, path):
+        wd = self.paths.pop(path, None)
+        if wd is not None:
+            self.watches.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout):
+        # Returns [(directory, name)]; name None means "re-read the whole directory"
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changes = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # The kernel dropped events; every watched folder must be re-read
+                changes.extend((path, None) for path in list(self.paths))
+                continue
+            path = self.watches.get(wd)
+            if path is None:
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                self.paths.pop(path, None)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                changes.append((os.path.dirname(path), os.path.basename(path)))
+                continue
+            changes.append((path, os.fsdecode(name)))
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    # Fallback: compare scandir snapshots; only entries whose inode, size or mtime moved are reported.
+    # A folder is only re-read when its own mtime moved, so in-place edits that keep every name show up late or not
+    # at all; creates, deletes and renames are what the listing needs.
+    INTERVAL = 1.0
+    # A folder mtime this recent may still change within the same tick, so it is not trusted yet
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self):
+        # path -> (directory stamp, {name: (inode, size, mtime)}), or None until the first snapshot is taken
+        self.snapshots = {}
+        self.polled_at = time.monotonic()
+
+    @classmethod
+    def stamp(cls, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if time.time_ns() - stat.st_mtime_ns < cls.RACY_WINDOW_NS:
+            return None
+        return stat.st_dev, stat.st_ino, stat.st_mtime_ns
+
+    @staticmethod
+    def snapshot(path):
+        state = {}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    state[entry.name] = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            return None
+        return state
+
+    def add(self, path):
+        # Called on the UI thread; the first snapshot is taken on the watcher thread
+        self.snapshots[path] = None
+
+    def remove(self, path):
+        self.snapshots.pop(path, None)
+
+    def read(self, timeout):
+        # Folders added since the last call get their first snapshot before anything else
+        for path, before in list(self.snapshots.items()):
+            if before is None:
+                self._take(path)
+
+        # Sleep until the next poll is due, or for `timeout` if that comes first
+        wait = self.polled_at + self.INTERVAL - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(0.0, wait))
+        self.polled_at = time.monotonic()
+
+        changes = []
+        for path, before in list(self.snapshots.items()):
+            if before is None:
+                self._take(path)
+                continue
+            if before[0] is not None and self.stamp(path) == before[0]:
+                continue
+            after = self._take(path)
+            if after is None:
+                continue
+            if before[1] is None or after[1] is None:
+                if before[1] != after[1]:
+                    changes.append((path, None))
+                continue
+            for name in before[1].keys() | after[1].keys():
+                if before[1].get(name) != after[1].get(name):
+                    changes.append((path, name))
+        return changes
+
+    def _take(self, path):
+        # The stamp is taken before the read, so a change during the read is seen at the next poll
+        snapshot = (self.stamp(path), self.snapshot(path))
+        if path not in self.snapshots:
+            return None
+        self.snapshots[path] = snapshot
+        return snapshot
+
+    def close(self):
+        self.snapshots.clear()
+
+
+class FolderWatcher:
+    # Bursts of events are coalesced for this long before they are resolved and delivered
+    COALESCE_SECONDS = 0.2
+
+    def __init__(self, post, on_changes):
+        # `on_changes(directory, entries, removed_paths)` runs on the UI thread; entries None means "re-read"
+        self.post = post
+        self.on_changes = on_changes
+        self.lock = threading.Lock()
+        self.watched = set()
+        self.backend = self._create_backend()
+        self.stopped = False
+        threading.Thread(target=self._run, daemon=True).start()
+
+    @staticmethod
+    def _create_backend():
+        if sys.platform.startswith("linux"):
+            try:
+                return InotifyBackend()
+            except (OSError, AttributeError, TypeError):
+                pass
+        return PollingBackend()
+
+    def watch(self, paths):
+        # Replace the watched set, touching only the folders that were added or dropped
+        paths = {os.fspath(path) for path in paths}
+        with self.lock:
+            for path in self.watched - paths:
+                self.backend.remove(path)
+            for path in paths - self.watched:
+                try:
+                    self.backend.add(path)
+                except OSError:
+                    paths.discard(path)
+            self.watched = paths
+
+    def stop(self):
+        self.stopped = True
+
+    def _run(self):
+        pending = {}
+        deadline = None
+        while not self.stopped:
+            timeout = self.COALESCE_SECONDS if deadline is None else max(0.0, deadline - time.monotonic())
+            for directory, name in self.backend.read(timeout):
+                names = pending.setdefault(directory, set())
+                if name is None or names is None:
+                    pending[directory] = None
+                elif name not in HIDDEN_NAMES:
+                    names.add(name)
+                if deadline is None:
+                    deadline = time.monotonic() + self.COALESCE_SECONDS
+
+            if deadline is not None and time.monotonic() >= deadline:
+                for directory, names in pending.items():
+                    self._deliver(directory, names)
+                pending = {}
+                deadline = None
+        self.backend.close()
+
+    def _deliver(self, directory, names):
+        # Resolve each changed name to its final state: present (insert/update) or gone (delete)
+        if names is None:
+            self.post(self.on_changes, directory, None, None)
+            return
+
+        entries = []
+        removed = []
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                entry = FileEntry.from_path(path)
+            except OSError:
+                removed.append(path)
+                continue
+            entries.append(entry)
+        if entries or removed:
+            self.post(self.on_changes, directory, entries, removed)
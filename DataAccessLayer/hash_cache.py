@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+
+from CommonLayer.app_paths import cache_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    partial BLOB,
+    full BLOB,
+    PRIMARY KEY (dev, ino)
+);
+"""
+
+
+class HashCache:
+    # Content hashes keyed by inode; a row only counts while the file's size and mtime are unchanged
+    BATCH_SIZE = 500
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(cache_dir(), "hash_cache.sqlite3")
+        self.local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def lookup(self, files):
+        # files: [(dev, ino, size, mtime_ns)] -> {(dev, ino): (partial, full)} for rows that are still current
+        connection = self._connection()
+        found = {}
+        for start in range(0, len(files), self.BATCH_SIZE):
+            batch = files[start:start + self.BATCH_SIZE]
+            stamps = {(dev, ino): (size, mtime_ns) for dev, ino, size, mtime_ns in batch}
+            clause = " OR ".join(["(dev = ? AND ino = ?)"] * len(batch))
+            args = [value for dev, ino, _, _ in batch for value in (dev, ino)]
+            for dev, ino, size, mtime_ns, partial, full in connection.execute(
+                    f"SELECT dev, ino, size, mtime_ns, partial, full FROM hashes WHERE {clause}", args):
+                if stamps.get((dev, ino)) == (size, mtime_ns):
+                    found[(dev, ino)] = (partial, full)
+        return found
+
+    def store(self, records):
+        # records: [(dev, ino, size, mtime_ns, partial, full)]; a full hash already known is never dropped
+        connection = self._connection()
+        connection.executemany(
+            "INSERT INTO hashes (dev, ino, size, mtime_ns, partial, full) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (dev, ino) DO UPDATE SET partial = excluded.partial, "
+            "full = CASE WHEN hashes.size = excluded.size AND hashes.mtime_ns = excluded.mtime_ns "
+            "THEN coalesce(excluded.full, hashes.full) ELSE excluded.full END, "
+            "size = excluded.size, mtime_ns = excluded.mtime_ns", records)
+        connection.commit()
+
+    def stats(self):
+        count = self._connection().execute("SELECT count(*) FROM hashes").fetchone()[0]
+        try:
+            size_bytes = os.path.getsize(self.db_path)
+        except OSError:
+            size_bytes = 0
+        return {"size_bytes": size_bytes, "entries": count}
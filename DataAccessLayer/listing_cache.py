@@ -0,0 +1,145 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from CommonLayer import settings
+
+
+class CachedListing:
+    __slots__ = ("stamp", "entries", "cost")
+
+    def __init__(self, stamp, entries, cost):
+        self.stamp = stamp
+        self.entries = entries
+        self.cost = cost
+
+
+class ListingCache:
+    # Rough per-entry overhead on top of the name and path strings
+    ENTRY_OVERHEAD = 160
+    # A directory modified this recently may change again within the same timestamp tick
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, budget_bytes=settings.LISTING_CACHE_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.listings = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def directory_stamp(path):
+        stat = os.stat(path)
+        return stat.st_dev, stat.st_ino, stat.st_mtime_ns
+
+    @staticmethod
+    def key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def get(self, path):
+        key = self.key(path)
+        try:
+            stamp = self.directory_stamp(path)
+        except OSError:
+            stamp = None
+
+        with self.lock:
+            listing = self.listings.get(key)
+            if listing is None or listing.stamp != stamp:
+                if listing is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self.listings.move_to_end(key)
+            self.hits += 1
+            return list(listing.entries.values())
+
+    def put(self, path, stamp, entries):
+        # `stamp` must be taken before the directory was read, so changes made during the read invalidate it
+        if time.time_ns() - stamp[2] < self.RACY_WINDOW_NS:
+            return
+
+        listing = CachedListing(stamp, {entry.path: entry for entry in entries}, 0)
+        listing.cost = sum(self.entry_cost(entry) for entry in entries)
+        if listing.cost > self.budget_bytes:
+            return
+
+        key = self.key(path)
+        with self.lock:
+            if key in self.listings:
+                self._drop(key)
+            self.listings[key] = listing
+            self.used_bytes += listing.cost
+            self._evict()
+
+    def invalidate(self, path):
+        with self.lock:
+            self._drop(self.key(path))
+
+    def clear(self):
+        with self.lock:
+            self.listings.clear()
+            self.used_bytes = 0
+
+    def add_entry(self, directory, entry):
+        self.apply_changes(directory, (entry,), ())
+
+    def remove_entry(self, directory, path):
+        self.apply_changes(directory, (), (path,))
+
+    def replace_entry(self, directory, old_path, entry):
+        self.apply_changes(directory, (entry,), (old_path,))
+
+    def apply_changes(self, directory, entries, removed_paths):
+        # Apply known changes to the cached listing and re-stamp it, instead of re-reading the directory
+        key = self.key(directory)
+        try:
+            stamp = self.directory_stamp(directory)
+        except OSError:
+            self.invalidate(directory)
+            return
+        if time.time_ns() - stamp[2] < self.RACY_WINDOW_NS:
+            # Same rule as put: another change within this timestamp tick would leave the new stamp valid
+            self.invalidate(directory)
+            return
+
+        with self.lock:
+            listing = self.listings.get(key)
+            if listing is None:
+                return
+            for path in removed_paths:
+                removed = listing.entries.pop(path, None)
+                if removed is not None:
+                    listing.cost -= self.entry_cost(removed)
+                    self.used_bytes -= self.entry_cost(removed)
+            for entry in entries:
+                replaced = listing.entries.get(entry.path)
+                if replaced is not None:
+                    listing.cost -= self.entry_cost(replaced)
+                    self.used_bytes -= self.entry_cost(replaced)
+                listing.entries[entry.path] = entry
+                listing.cost += self.entry_cost(entry)
+                self.used_bytes += self.entry_cost(entry)
+            listing.stamp = stamp
+            self._evict()
+
+    def stats(self):
+        with self.lock:
+            return {"listings": len(self.listings), "bytes": self.used_bytes, "budget": self.budget_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+    def entry_cost(self, entry):
+        return self.ENTRY_OVERHEAD + sys.getsizeof(entry.name) + sys.getsizeof(entry.path)
+
+    def _drop(self, key):
+        listing = self.listings.pop(key, None)
+        if listing is not None:
+            self.used_bytes -= listing.cost
+
+    def _evict(self):
+        while self.used_bytes > self.budget_bytes and self.listings:
+            _, listing = self.listings.popitem(last=False)
+            self.used_bytes -= listing.cost
@@ -0,0 +1,99 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from CommonLayer import settings
+
+
+class Thumbnail:
+    # Decoded pixels, ready for Image.frombytes on the UI thread
+    __slots__ = ("mode", "size", "data")
+
+    def __init__(self, mode, size, data):
+        self.mode = mode
+        self.size = size
+        self.data = data
+
+
+class ThumbnailCache:
+    # Byte-budgeted LRU of decoded thumbnails, backed by an optional folder of PNG files
+    def __init__(self, budget_bytes=settings.THUMBNAIL_CACHE_BUDGET_BYTES, disk_dir=None):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.disk_dir = disk_dir
+        self.thumbnails = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(path, max_size):
+        # The file's size and mtime are part of the key, so an edited image never shows a stale thumbnail
+        stat = os.stat(path)
+        return os.path.normcase(os.path.abspath(path)), stat.st_size, stat.st_mtime_ns, max_size
+
+    def get(self, key):
+        with self.lock:
+            thumbnail = self.thumbnails.get(key)
+            if thumbnail is not None:
+                self.thumbnails.move_to_end(key)
+                return thumbnail
+        thumbnail = self._load(key)
+        if thumbnail is not None:
+            self._remember(key, thumbnail)
+        return thumbnail
+
+    def put(self, key, thumbnail):
+        self._remember(key, thumbnail)
+        self._save(key, thumbnail)
+
+    def _remember(self, key, thumbnail):
+        cost = len(thumbnail.data)
+        if cost > self.budget_bytes:
+            return
+        with self.lock:
+            previous = self.thumbnails.pop(key, None)
+            if previous is not None:
+                self.used_bytes -= len(previous.data)
+            self.thumbnails[key] = thumbnail
+            self.used_bytes += cost
+            while self.used_bytes > self.budget_bytes:
+                _, evicted = self.thumbnails.popitem(last=False)
+                self.used_bytes -= len(evicted.data)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, digest[:2], digest + ".png")
+
+    def _load(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        if not os.path.isfile(path):
+            return None
+        from PIL import Image
+
+        try:
+            with Image.open(path) as image:
+                image = image.convert("RGBA")
+                return Thumbnail(image.mode, image.size, image.tobytes())
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key, thumbnail):
+        if self.disk_dir is None:
+            return
+        from PIL import Image
+
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            buffer = io.BytesIO()
+            Image.frombytes(thumbnail.mode, thumbnail.size, thumbnail.data).save(buffer, "PNG")
+            # Write then rename, so a reader never sees half a file
+            partial = path + ".part"
+            with open(partial, "wb") as out:
+                out.write(buffer.getvalue())
+            os.replace(partial, path)
+        except OSError:
+            pass
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from CommonLayer.file_entry import FileEntry
+
+
+def split_archive_path(path):
+    # "/data/a.zip/docs/x.txt" -> ("/data/a.zip", "docs/x.txt"); None when the path is not inside an archive
+    path = os.fspath(path)
+    parts = path.split(os.sep)
+    for index in range(1, len(parts) + 1):
+        if parts[index - 1].lower().endswith(".zip"):
+            archive = os.sep.join(parts[:index]) or os.sep
+            if os.path.isfile(archive):
+                return archive, "/".join(part for part in parts[index:] if part)
+    return None
+
+
+def is_archive(path):
+    return os.fspath(path).lower().endswith(".zip") and os.path.isfile(path)
+
+
+class ZipDirectory:
+    # Directory tree of one archive, built from its central directory only
+    def __init__(self, infos):
+        self.children = {"": {}}
+        for info in infos:
+            parts = [part for part in info.filename.split("/") if part not in ("", ".", "..")]
+            if not parts:
+                continue
+            # Intermediate folders are often implicit in the central directory
+            for depth in range(len(parts) - 1):
+                parent = "/".join(parts[:depth])
+                self.children.setdefault(parent, {}).setdefault(parts[depth], None)
+                self.children.setdefault("/".join(parts[:depth + 1]), {})
+            parent = "/".join(parts[:-1])
+            if info.is_dir():
+                self.children.setdefault(parent, {}).setdefault(parts[-1], None)
+                self.children.setdefault("/".join(parts), {})
+            else:
+                self.children.setdefault(parent, {})[parts[-1]] = info
+
+    def list(self, inner):
+        return self.children.get(inner.strip("/"))
+
+    def member(self, inner):
+        parent, _, name = inner.strip("/").rpartition("/")
+        return (self.children.get(parent) or {}).get(name)
+
+
+class ZipBrowser:
+    MAX_ARCHIVES = 16
+
+    def __init__(self):
+        self.directories = OrderedDict()
+        self.lock = threading.Lock()
+
+    def directory(self, archive):
+        # Parsed central directories are cached per archive and reused while size and mtime match
+        stat = os.stat(archive)
+        key = os.path.normcase(os.path.abspath(archive))
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            cached = self.directories.get(key)
+            if cached is not None and cached[0] == stamp:
+                self.directories.move_to_end(key)
+                return cached[1]
+
+        import pyzipper
+
+        with pyzipper.AESZipFile(archive) as zf:
+            directory = ZipDirectory(zf.infolist())
+        with self.lock:
+            self.directories[key] = (stamp, directory)
+            while len(self.directories) > self.MAX_ARCHIVES:
+                self.directories.popitem(last=False)
+        return directory
+
+    def list(self, path):
+        archive, inner = split_archive_path(path)
+        children = self.directory(archive).list(inner)
+        if children is None:
+            raise FileNotFoundError(path)
+
+        archive_stat = os.stat(archive)
+        entries = []
+        for name, info in children.items():
+            child = os.path.join(path, name)
+            if info is None:
+                entries.append(FileEntry(name, child, True, 0, archive_stat.st_mtime, archive_stat.st_ctime))
+            else:
+                modified = time.mktime(info.date_time + (0, 0, -1))
+                entries.append(FileEntry(name, child, False, info.file_size, modified, modified))
+        return entries
+
+    def subfolders(self, path):
+        return [entry for entry in self.list(path) if entry.is_dir]
+
+    def member(self, path):
+        archive, inner = split_archive_path(path)
+        return self.directory(archive).member(inner)
+
+    def extract_member(self, path, password=None):
+        # Pull a single member out to a per-archive temp folder, reusing an earlier copy when it is complete
+        import pyzipper
+
+        archive, inner = split_archive_path(path)
+        info = self.directory(archive).member(inner)
+        if info is None:
+            raise FileNotFoundError(path)
+
+        stat = os.stat(archive)
+        digest = hashlib.sha1(f"{os.path.abspath(archive)}|{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest()
+        target = os.path.join(tempfile.gettempdir(), "FileExplorer-zip", digest[:16], *inner.split("/"))
+        if os.path.isfile(target) and os.path.getsize(target) == info.file_size:
+            return target
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with pyzipper.AESZipFile(archive) as zf:
+            if password:
+                zf.setpassword(password.encode("utf-8"))
+            partial = target + ".part"
+            with zf.open(info) as source, open(partial, "wb") as out:
+                while True:
+                    chunk = source.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+        os.replace(partial, target)
+        return target
@@ -0,0 +1,171 @@
+import argparse
+import json
+import sys
+import time
+
+from BusinessLogicLayer.file_operations import FileOperations
+from CommonLayer import settings
+
+COMMANDS = ("list", "search", "zip", "extract", "delete")
+# Progress lines are written at most this often per job
+PROGRESS_INTERVAL = 0.5
+
+
+def entry_record(entry, label=None):
+    record = {"event": "entry", "path": entry.path, "name": entry.name, "is_dir": entry.is_dir, "size": entry.size,
+              "modified": entry.modified, "created": entry.created}
+    if label is not None:
+        record["label"] = label
+    return record
+
+
+class BatchRunner:
+    # Runs jobs given as dicts ({"command": "list", "path": ...}) and streams every result as one JSON line
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.operations = FileOperations()
+
+    def emit(self, record, flush=False):
+        # ensure_ascii keeps undecodable file names (surrogate escapes) writable on any stdout
+        self.out.write(json.dumps(record) + "\n")
+        if flush:
+            self.out.flush()
+
+    def run(self, job):
+        command = job.get("command")
+        handler = getattr(self, f"run_{command}", None) if command in COMMANDS else None
+        emit = self.tagger(job.get("id"))
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown command {command!r}; expected one of {', '.join(COMMANDS)}")
+            summary = handler(job, emit)
+        except Exception as e:
+            emit({"event": "error", "command": command, "error": str(e), "type": type(e).__name__}, flush=True)
+            return False
+        emit({"event": "done", "command": command, **summary, "seconds": round(time.perf_counter() - started, 6)},
+             flush=True)
+        return True
+
+    def tagger(self, job_id):
+        # Every line of a job carries its id, so a caller can interleave jobs from one stream
+        def emit(record, flush=False):
+            if job_id is not None:
+                record["id"] = job_id
+            self.emit(record, flush)
+        return emit
+
+    def progress(self, emit):
+        reported_at = [0.0]
+
+        def progress(done, total, unit="bytes"):
+            now = time.perf_counter()
+            if now - reported_at[0] >= PROGRESS_INTERVAL:
+                reported_at[0] = now
+                emit({"event": "progress", "done": done, "total": total, "unit": unit}, flush=True)
+        return progress
+
+    @staticmethod
+    def required(job, key):
+        value = job.get(key)
+        if not value:
+            raise ValueError(f"'{job.get('command')}' needs '{key}'")
+        return value
+
+    def run_list(self, job, emit):
+        count = 0
+        for entry in self.operations.list_folder(self.required(job, "path")):
+            emit(entry_record(entry))
+            count += 1
+        return {"count": count}
+
+    def run_search(self, job, emit):
+        if job.get("index") and self.operations.index is None:
+            # Only searches that ask for the filename index pay for opening it
+            from DataAccessLayer.filename_index import FilenameIndex
+
+            self.operations.index = FilenameIndex()
+
+        def on_batch(entries, labels):
+            for entry in entries:
+                emit(entry_record(entry, labels.get(entry.path) if labels else None))
+
+        return self.operations.search(self.required(job, "root"), self.required(job, "term"), on_batch,
+                                      use_index=bool(job.get("index")),
+                                      limit=int(job.get("limit") or settings.SEARCH_RESULT_CAP))
+
+    def run_zip(self, job, emit):
+        return self.operations.zip(self.required(job, "items"), self.required(job, "output"), job.get("password"),
+                                   progress=self.progress(emit))
+
+    def run_extract(self, job, emit):
+        return self.operations.extract(self.required(job, "archive"), job.get("destination"), job.get("password"),
+                                       progress=self.progress(emit))
+
+    def run_delete(self, job, emit):
+        result = self.operations.delete(self.required(job, "paths"), progress=self.progress(emit))
+        for path, message in result["errors"]:
+            emit({"event": "item_error", "path": path, "error": message})
+        return {"deleted": result["deleted"], "errors": len(result["errors"])}
+
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(prog="main.py --batch",
+                                     description="Run file operations without the GUI. Results are written as JSON "
+                                                 "lines. Without a command, jobs are read as JSON lines from stdin.")
+    commands = parser.add_subparsers(dest="command")
+
+    list_parser = commands.add_parser("list", help="list one folder")
+    list_parser.add_argument("path")
+
+    search_parser = commands.add_parser("search", help="search file names, or contents with 'content:'")
+    search_parser.add_argument("root")
+    search_parser.add_argument("term")
+    search_parser.add_argument("--limit", type=int)
+    search_parser.add_argument("--index", action="store_true", help="answer from the filename index if it covers root")
+
+    zip_parser = commands.add_parser("zip", help="create a zip archive")
+    zip_parser.add_argument("items", nargs="+")
+    zip_parser.add_argument("--output", required=True)
+    zip_parser.add_argument("--password")
+
+    extract_parser = commands.add_parser("extract", help="extract a zip archive")
+    extract_parser.add_argument("archive")
+    extract_parser.add_argument("--destination")
+    extract_parser.add_argument("--password")
+
+    delete_parser = commands.add_parser("delete", help="delete files and folders")
+    delete_parser.add_argument("paths", nargs="+")
+
+    return parser.parse_args(argv)
+
+
+def read_jobs(stream, runner):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("each line must be a JSON object")
+        except ValueError as e:
+            runner.emit({"event": "error", "line": line_number, "error": f"Invalid job: {e}",
+                         "type": "ValueError"}, flush=True)
+            yield None
+            continue
+        yield job
+
+
+def main(argv=None):
+    arguments = parse_arguments(sys.argv[1:] if argv is None else argv)
+    runner = BatchRunner()
+    try:
+        if arguments.command is None:
+            results = [runner.run(job) if job is not None else False for job in read_jobs(sys.stdin, runner)]
+            return 0 if all(results) else 1
+        job = {key: value for key, value in vars(arguments).items() if value is not None and value is not False}
+        return 0 if runner.run(job) else 1
+    except KeyboardInterrupt:
+        # The engines' pools shut down on the way out, as they do for the GUI's Cancel button
+        return 130
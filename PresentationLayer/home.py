@@ -1,9 +1,35 @@
 from ttkbootstrap import Frame, Menubutton, Menu, Treeview, Scrollbar, PanedWindow, Label, Button, Entry
 from ttkbootstrap.dialogs import Messagebox, Querybox
 from pathlib import Path
-import pyzipper
-import psutil
-import shutil
+from DataAccessLayer.directory_lister import DirectoryLister, list_subfolders
+from DataAccessLayer.listing_cache import ListingCache
+from DataAccessLayer.filename_index import FilenameIndex
+from DataAccessLayer.zip_browser import ZipBrowser, split_archive_path, is_archive
+from DataAccessLayer.folder_watcher import FolderWatcher
+from DataAccessLayer.hash_cache import HashCache
+from DataAccessLayer.thumbnail_cache import ThumbnailCache
+from BusinessLogicLayer.search_engine import SearchEngine
+from BusinessLogicLayer.content_search import ContentSearchEngine, parse_query
+from BusinessLogicLayer.extract_engine import ZipSafetyError
+from BusinessLogicLayer.file_operations import FileOperations, ZipPasswordError, zip_destination, extract_destination
+from BusinessLogicLayer.rename_engine import RenameEngine, RenamePattern, RenamePatternError
+from BusinessLogicLayer.disk_usage import DiskUsage
+from BusinessLogicLayer.duplicate_finder import DuplicateFinder
+from BusinessLogicLayer.transfer_engine import TransferEngine, SKIP, OVERWRITE, RENAME
+from BusinessLogicLayer.preview_engine import PreviewEngine
+from CommonLayer import settings, tracing
+from CommonLayer.app_paths import cache_dir
+from CommonLayer.startup_timer import elapsed_ms, record_startup
+from CommonLayer.file_entry import FileEntry
+from CommonLayer.formatting import format_size
+from PresentationLayer.ui_pump import UiPump
+from PresentationLayer.virtual_file_pane import VirtualFilePane
+from PresentationLayer.job_runner import JobRunner
+from PresentationLayer.preview_pane import PreviewPane
+import os
+import subprocess
+import sys
+import threading
 import time
 
 
@@ -13,13 +39,49 @@ class Home(Frame):
 
         self.main_view = view
 
+        # Background work reports back to the UI thread through this pump
+        self.ui_pump = UiPump(self)
+        self.listing_cache = ListingCache()
+        self.zip_browser = ZipBrowser()
+        self.directory_lister = DirectoryLister(self.ui_pump.post, self.listing_cache, self.zip_browser)
+
+        # External changes to the shown folder and expanded nodes arrive as coalesced row-level updates
+        self.folder_watcher = FolderWatcher(self.ui_pump.post, self.on_fs_changes)
+        self.pane_folder = None
+        self.expanded_folders = {}
+
+        # On-disk filename index that answers searches without walking the tree
+        self.filename_index = FilenameIndex()
+        self.index_refreshed_at = {}
+        self.index_building = False
+
+        # Live search runs as a cancellable pipeline on a worker thread
+        self.search_engine = SearchEngine(self.ui_pump.post, self.filename_index)
+        self.search_job = None
+        self.last_search_term = ""
+        self.search_started = 0
+        self.search_from_index = False
+        # Spans of the listing and search in flight; they end when the last batch arrives (FILEEXPLORER_TRACE)
+        self.listing_span = tracing.NULL_SPAN
+        self.search_span = tracing.NULL_SPAN
+        # "content: text ext:py size<1MB" in the search box greps file contents instead of names
+        self.content_search = ContentSearchEngine(self.ui_pump.post)
+
+        # Optional recursive folder sizes, measured in parallel and cached per folder by mtime
+        self.disk_usage = DiskUsage(self.ui_pump.post)
+        self.show_folder_sizes = False
+
+        # Previews are decoded on a worker; thumbnails are kept in memory and, optionally, on disk
+        thumbnail_dir = cache_dir("thumbnails") if settings.THUMBNAIL_DISK_CACHE else None
+        self.preview_engine = PreviewEngine(self.ui_pump.post, ThumbnailCache(disk_dir=thumbnail_dir))
+
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
 
         self.menu_bar = Frame(self)
         self.menu_bar.grid(row=0, column=0, pady=(1, 0), sticky="ew")
 
-        self.menu_bar.grid_columnconfigure(9, weight=1)
+        self.menu_bar.grid_columnconfigure(14, weight=1)
 
         self.theme_button = Menubutton(self.menu_bar, text="Themes")
         self.theme_button.grid(row=0, column=0)
@@ -41,21 +103,38 @@ class Home(Frame):
         self.delete_items_button = Button(self.menu_bar, text="Delete", width=11, command=self.delete_item)
         self.delete_items_button.grid(row=0, column=4, padx=(1, 0))
 
+        self.copy_button = Button(self.menu_bar, text="Copy", width=11, command=self.copy_items)
+        self.copy_button.grid(row=0, column=5, padx=(1, 0))
+
+        self.cut_button = Button(self.menu_bar, text="Cut", width=11, command=self.cut_items)
+        self.cut_button.grid(row=0, column=6, padx=(1, 0))
+
+        self.paste_button = Button(self.menu_bar, text="Paste", width=11, command=self.paste_items)
+        self.paste_button.grid(row=0, column=7, padx=(1, 0))
+
         self.zip_button = Button(self.menu_bar, text="Zip", width=11, command=self.zip_files)
-        self.zip_button.grid(row=0, column=5, padx=(1, 0))
+        self.zip_button.grid(row=0, column=8, padx=(1, 0))
 
         self.extract_button = Button(self.menu_bar, text="Extract", width=11, command=self.extract_zip)
-        self.extract_button.grid(row=0, column=6, padx=(1, 0))
+        self.extract_button.grid(row=0, column=9, padx=(1, 0))
 
         self.refresh_button = Button(self.menu_bar, text="Refresh", width=11, command=self.refresh_page)
-        self.refresh_button.grid(row=0, column=7, padx=(1, 0))
+        self.refresh_button.grid(row=0, column=10, padx=(1, 0))
+
+        self.folder_sizes_button = Button(self.menu_bar, text="Folder Sizes", width=11,
+                                          command=self.toggle_folder_sizes)
+        self.folder_sizes_button.grid(row=0, column=11, padx=(1, 0))
+
+        self.duplicates_button = Button(self.menu_bar, text="Duplicates", width=11, command=self.find_duplicates)
+        self.duplicates_button.grid(row=0, column=12, padx=(1, 0))
 
         self.search_label = Label(self.menu_bar, text="Search")
-        self.search_label.grid(row=0, column=8, padx=(20, 0))
+        self.search_label.grid(row=0, column=13, padx=(20, 0))
 
         self.search_entry = Entry(self.menu_bar)
-        self.search_entry.grid(row=0, column=9, padx=5, sticky="ew")
+        self.search_entry.grid(row=0, column=14, padx=5, sticky="ew")
         self.search_entry.bind("<KeyRelease>", self.search)
+        self.search_entry.bind("<Escape>", self.cancel_search)
 
         # Create a PanedWindow for the file explorer
         self.paned_window = PanedWindow(self, orient='horizontal')
@@ -68,8 +147,10 @@ class Home(Frame):
         self.left_pane.grid_columnconfigure(0, weight=1)
         self.left_pane.grid_rowconfigure(0, weight=1)
 
-        self.folder_tree = Treeview(self.left_pane)
+        self.folder_tree = Treeview(self.left_pane, columns=("Size",), displaycolumns=())
         self.folder_tree.grid(row=0, column=0, sticky="nsew")
+        self.folder_tree.heading("Size", text="Size", anchor="w")
+        self.folder_tree.column("Size", width=80, stretch=False)
 
         self.folder_scrollbar = Scrollbar(self.left_pane, orient='vertical', command=self.folder_tree.yview)
         self.folder_scrollbar.grid(row=0, column=1, sticky="ns")
@@ -98,9 +179,15 @@ class Home(Frame):
         self.file_tree.column("Type", width=100)
         self.file_tree.column("Size", width=100)
 
-        self.file_scrollbar = Scrollbar(self.right_pane, orient='vertical', command=self.file_tree.yview)
+        self.file_scrollbar = Scrollbar(self.right_pane, orient='vertical')
         self.file_scrollbar.grid(row=0, column=1, sticky="ns")
-        self.file_tree.config(yscrollcommand=self.file_scrollbar.set)
+
+        # The file pane only materializes the rows in view; it owns the scrollbar and the selection
+        self.file_pane = VirtualFilePane(self.file_tree, self.file_scrollbar, on_select=self.on_file_selection)
+
+        # Preview of the focused file, to the right of the file list
+        self.preview_pane = PreviewPane(self.paned_window, self.preview_engine)
+        self.paned_window.add(self.preview_pane, weight=6)
 
         # Create a status bar
         self.status_bar = Frame(self)
@@ -109,98 +196,257 @@ class Home(Frame):
         self.status_label = Label(self.status_bar, text="Status: Ready")
         self.status_label.grid(row=0, column=0, padx=10, pady=5)
 
-        # Populate the folder tree
-        self.populate_folders()
+        self.cancel_button = Button(self.status_bar, text="Cancel", width=11, command=self.cancel_jobs)
+        self.cancel_button.grid(row=0, column=1, padx=(1, 0))
+        self.cancel_button.grid_remove()
+
+        # Long operations (zip, extract, ...) run as background jobs that can be cancelled
+        self.jobs = JobRunner(self.ui_pump.post, lambda text: self.status_label.config(text=text), self.set_busy)
+        self.operations = FileOperations(self.filename_index)
+        self.rename_engine = RenameEngine()
+        self.transfer_engine = TransferEngine()
+        # Content hashes are cached on disk by inode, size and mtime, so repeat scans skip unchanged files
+        self.duplicate_finder = DuplicateFinder(HashCache())
+
+        # Copy/Cut remember the items as ("copy" | "move", paths); Paste runs the transfer as a job
+        self.clipboard = None
+
+        # Only the root node is created now; drives are enumerated once the window has painted
+        self.this_pc_node = self.folder_tree.insert("", "end", text="This PC", open=True)
+        self.folder_tree.tag_configure("unresponsive", foreground="gray")
+        self.loaded_folders = set()
+        self.startup_ms = None
+        self.after_idle(self.on_window_ready)
 
         # Bind the folder tree selection event
         self.folder_tree.bind("<<TreeviewOpen>>", self.on_folder_expand)
+        self.folder_tree.bind("<<TreeviewClose>>", self.on_folder_collapse)
         self.folder_tree.bind("<<TreeviewSelect>>", self.on_folder_select)
         self.folder_tree.bind("<<TreeviewSelect>>", self.on_folder_selection_change)
-        self.file_tree.bind("<<TreeviewSelect>>", self.update_status_bar)
+        self.file_tree.bind("<Double-1>", self.open_item)
 
     def change_theme(self, theme_name):
         self.main_view.window.set_theme(theme_name)
 
+    def on_window_ready(self):
+        # First idle callback after the initial paint: this is the cold-start time
+        self.startup_ms = elapsed_ms()
+        record_startup(self.startup_ms, cache_dir())
+        self.status_label.config(text=f"Status: Ready (started in {self.startup_ms:.0f} ms)")
+        threading.Thread(target=self.populate_folders, daemon=True).start()
+
     def populate_folders(self):
-        # Create "This PC" node
-        this_pc_node = self.folder_tree.insert("", "end", text="This PC", open=True)
+        # Runs on a worker thread; psutil is only imported here, off the startup path
+        import psutil
 
         # Get all drives
         drives = [disk.device for disk in psutil.disk_partitions()]
-
-        # Populate the folder tree with drives
         for drive in drives:
-            drive_node = self.folder_tree.insert(this_pc_node, "end", iid=str(Path(drive)), text=drive, open=False)
-            # Call `insert_subfolders` to add only subfolders
-            self.insert_subfolders(drive_node, Path(drive))
+            self.ui_pump.post(self.insert_drive, drive)
+
+        # List every drive root in parallel; a mount that does not answer in time is marked, not waited for
+        workers = [threading.Thread(target=self.read_subfolders, args=(str(Path(drive)), Path(drive), True),
+                                    daemon=True) for drive in drives]
+        for worker in workers:
+            worker.start()
+        deadline = time.monotonic() + settings.MOUNT_TIMEOUT_SECONDS
+        for drive, worker in zip(drives, workers):
+            worker.join(max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                self.ui_pump.post(self.mark_unresponsive, str(Path(drive)))
+
+    def insert_drive(self, drive):
+        drive_node = self.folder_tree.insert(self.this_pc_node, "end", iid=str(Path(drive)), text=drive, open=False)
+        self.folder_tree.insert(drive_node, "end")  # Allows expansion
+
+    def mark_unresponsive(self, node):
+        if self.folder_tree.exists(node) and node not in self.loaded_folders:
+            self.folder_tree.item(node, tags=("unresponsive",))
+
+    def read_subfolders(self, node, path, prefetch=False):
+        # Worker thread: list subfolders, then hand them to the UI thread
+        try:
+            if split_archive_path(path) is not None:
+                # Folders inside a zip archive come from its central directory
+                subfolders = [(entry.name, entry.path) for entry in self.zip_browser.subfolders(path)]
+            else:
+                subfolders = list_subfolders(path)
+        except Exception:
+            subfolders = []
+        self.ui_pump.post(self.on_subfolders_loaded, node, subfolders, prefetch)
+
+    def on_subfolders_loaded(self, node, subfolders, prefetch):
+        # A background prefetch never overwrites a node the user has already expanded
+        if not self.folder_tree.exists(node) or (prefetch and node in self.loaded_folders):
+            return
+        self.loaded_folders.add(node)
+        self.folder_tree.item(node, tags=())
+        self.folder_tree.delete(*self.folder_tree.get_children(node))
+        for name, path in subfolders:
+            # Use the full path as the iid
+            child = self.folder_tree.insert(node, "end", iid=path, text=name, open=False)
+            self.folder_tree.insert(child, "end")  # Allows expansion
+        if node in self.expanded_folders:
+            self.measure_folders()
 
     def insert_subfolders(self, parent, path):
+        # Synchronous variant, for revealing a folder that must exist in the tree right away
         try:
-            for folder in path.iterdir():
-                if folder.is_dir():
-                    # Use the full path as the iid
-                    node = self.folder_tree.insert(parent, "end", iid=str(folder), text=folder.name, open=False)
-                    self.folder_tree.insert(node, "end")  # Allows expansion
-        except (PermissionError, FileNotFoundError):
-            pass
+            if split_archive_path(path) is not None:
+                subfolders = [(entry.name, entry.path) for entry in self.zip_browser.subfolders(path)]
+            else:
+                subfolders = list_subfolders(path)
+        except Exception:
+            return
+        self.on_subfolders_loaded(parent, subfolders, False)
 
     def on_folder_expand(self, _):
-        # Get the selected folder
-        selected_item = self.folder_tree.selection()[0]
+        # Get the folder being expanded (it has the focus, even when it is not selected)
+        selected_item = self.folder_tree.focus()
         folder_path = self.get_full_path(selected_item)
 
-        # Clear the dummy child first
-        self.folder_tree.delete(*self.folder_tree.get_children(selected_item))
-
         # Check if the selected item is valid path and not "This PC"
-        if selected_item and folder_path and folder_path.is_dir():
-            # Populate the folder tree with subfolders
-            self.insert_subfolders(selected_item, folder_path)
+        if selected_item and folder_path and selected_item != self.this_pc_node:
+            # Populate the folder tree with subfolders on a worker thread; the dummy child stays until then
+            threading.Thread(target=self.read_subfolders, args=(selected_item, folder_path), daemon=True).start()
+            self.expanded_folders[selected_item] = str(folder_path)
+            self.update_watches()
 
+    def on_folder_collapse(self, _):
+        self.expanded_folders.pop(self.folder_tree.focus(), None)
+        self.update_watches()
+
+    @tracing.traced()
     def on_folder_select(self, _):
         # Get the selected folder
         selected_item = self.folder_tree.selection()[0]
         folder_path = self.get_full_path(selected_item)
 
         # Clear the file tree
-        self.file_tree.delete(*self.file_tree.get_children())
+        self.search_engine.cancel()
+        self.content_search.cancel()
+        self.file_pane.clear()
+        self.preview_pane.show(None)
+        if folder_path is None:
+            self.directory_lister.cancel()
+            self.pane_folder = None
+            self.update_watches()
+            self.update_status_bar()
+            return
+        self.status_label.config(text="Loading...")
+
+        # The pane now mirrors this folder, so changes reported by the watcher apply to it
+        self.pane_folder = str(folder_path)
+        self.update_watches()
+
+        # List the folder on a worker thread; rows arrive in batches through the UI pump
+        self.listing_span.end(superseded=True)
+        self.listing_span = tracing.begin("list folder", path=self.pane_folder)
+        self.directory_lister.list_async(folder_path, self.on_listing_batch, self.on_listing_done,
+                                         self.on_listing_error)
+
+    def update_watches(self):
+        # Watch the folder shown in the right pane and every expanded node of the folder tree
+        folders = set(self.expanded_folders.values())
+        if self.pane_folder:
+            folders.add(self.pane_folder)
+        self.folder_watcher.watch(folder for folder in folders if split_archive_path(folder) is None)
+
+    def on_fs_changes(self, directory, entries, removed):
+        # Every folder size that includes this folder is stale now
+        self.disk_usage.invalidate(directory)
+        if entries is None:
+            # Events were lost; fall back to re-reading that folder
+            self.listing_cache.invalidate(directory)
+            if directory == self.pane_folder:
+                self.on_folder_select(None)
+            return
 
-        # Populate the file tree with files and folders in the selected folder
-        try:
-            for item in Path(folder_path).iterdir():
-                item_type = "Folder" if item.is_dir() else item.suffix
-                item_size = self.format_size(item.stat().st_size) if item.is_file() else ""
-                date_modified = time.strftime("%d/%m/%Y %I:%M %p", time.localtime(item.stat().st_mtime))
-                date_created = time.strftime("%d/%m/%Y %I:%M %p", time.localtime(item.stat().st_ctime))
-                self.file_tree.insert("", "end", iid=str(item),
-                                      values=(item.name, date_modified, date_created, item_type, item_size))
-        except PermissionError:
+        self.listing_cache.apply_changes(directory, entries, removed)
+
+        # Row-level updates: one Treeview operation per changed entry that is in view
+        if directory == self.pane_folder:
+            self.file_pane.upsert(entries)
+            self.file_pane.remove(removed)
+            self.update_status_bar()
+
+        # Loaded (expanded) folder-tree nodes gain or lose subfolders the same way
+        if directory in self.expanded_folders.values() and self.folder_tree.exists(directory):
+            for entry in entries:
+                if (entry.is_dir or is_archive(entry.path)) and not self.folder_tree.exists(entry.path):
+                    node = self.folder_tree.insert(directory, "end", iid=entry.path, text=entry.name, open=False)
+                    self.folder_tree.insert(node, "end")  # Allows expansion
+            for path in removed:
+                if self.folder_tree.exists(path):
+                    self.folder_tree.delete(path)
+        self.measure_folders()
+
+    def on_listing_batch(self, entries):
+        self.file_pane.extend(entries)
+
+    def on_listing_done(self):
+        self.listing_span.end(items=len(self.file_pane))
+        # Update the status bar
+        self.update_status_bar()
+        self.measure_folders()
+
+    def toggle_folder_sizes(self):
+        self.show_folder_sizes = not self.show_folder_sizes
+        if self.show_folder_sizes:
+            self.folder_sizes_button.config(text="Hide Sizes")
+            self.folder_tree.config(displaycolumns=("Size",))
+            # Largest first: folders climb to the top as their subtrees finish
+            self.file_pane.sort_by("Size", descending=True)
+            self.measure_folders()
+        else:
+            self.folder_sizes_button.config(text="Folder Sizes")
+            self.folder_tree.config(displaycolumns=())
+            self.disk_usage.cancel()
+            if self.pane_folder:
+                # Re-list from the listing cache so folder rows drop their measured sizes
+                self.on_folder_select(None)
+
+    def measure_folders(self):
+        # Subfolders shown in the right pane and under expanded folder-tree nodes; dummy children are skipped
+        if not self.show_folder_sizes:
+            return
+        roots = self.file_pane.model.folder_paths()
+        for node in self.expanded_folders:
+            if self.folder_tree.exists(node):
+                roots.extend(self.folder_tree.get_children(node))
+        roots = [root for root in roots if os.path.isabs(root) and split_archive_path(root) is None]
+        self.disk_usage.measure_async(roots, self.on_folder_size)
+
+    def on_folder_size(self, path, size):
+        self.file_pane.set_sizes([(path, size)])
+        if self.folder_tree.exists(path):
+            self.folder_tree.set(path, "Size", format_size(size))
+
+    def on_listing_error(self, error):
+        self.listing_span.end(error=type(error).__name__)
+        if isinstance(error, PermissionError):
             Messagebox.show_error("You do not have permission to access this folder.", "Permission Error")
-        except FileNotFoundError:
+        elif isinstance(error, FileNotFoundError):
             Messagebox.show_error("The specified folder was not found.", "File Not Found")
+        else:
+            Messagebox.show_error(f"An error occurred while listing the folder: {str(error)}", "Error")
 
-        # Update the status bar
         self.update_status_bar()
 
+    def on_file_selection(self):
+        self.update_status_bar()
+        # Only a single selected file is previewed; the pane stays empty for multi-selections
+        if self.file_pane.selection_summary()[0] == 1:
+            self.preview_pane.show(self.file_pane.selection()[0])
+        else:
+            self.preview_pane.show(None)
+
     def update_status_bar(self, _=None):
         # Get all items in the file tree
-        all_items = self.file_tree.get_children()
-        total_items = len(all_items)
-
-        # Get selected items
-        selected_items = self.file_tree.selection()
-        selected_count = len(selected_items)
-
-        # Calculate total size if only files are selected
-        total_size = 0
-        all_files = True
-        for item in selected_items:
-            item_values = self.file_tree.item(item, "values")
-            item_path = Path(self.get_full_path(self.folder_tree.selection()[0])) / item_values[0]
-            if item_path.is_file():
-                total_size += item_path.stat().st_size
-            else:
-                all_files = False
+        total_items = len(self.file_pane)
+
+        # Running totals kept by the pane as the selection changes; no per-item lookups or stat calls
+        selected_count, total_size, all_files = self.file_pane.selection_summary()
 
         # Format total size
         size_str = self.format_size(total_size)
@@ -217,21 +463,13 @@ class Home(Frame):
 
     @staticmethod
     def format_size(size):
-        if size < 1024:
-            return f"{size} B"
-        elif size < 1024 ** 2:
-            return f"{size / 1024:.2f} KB"
-        elif size < 1024 ** 3:
-            return f"{size / 1024 ** 2:.2f} MB"
-        else:
-            return f"{size / 1024 ** 3:.2f} GB"
+        return format_size(size)
 
     def get_full_path(self, item):
-        path = []
-        while item:
-            path.insert(0, self.folder_tree.item(item, "text"))
-            item = self.folder_tree.parent(item)
-        return Path("C:\\").joinpath(*path)
+        # Folder-tree iids are the folders' own paths, so no walk up the tree is needed; "This PC" has none
+        if not item or item == self.this_pc_node:
+            return None
+        return Path(item)
 
     def create_item(self):
         # Get selected folder from the left pane
@@ -241,6 +479,11 @@ class Home(Frame):
             return
 
         folder_path = self.get_full_path(selected_item[0])
+        if folder_path is None:
+            Messagebox.show_error("Please select a valid folder in the left pane.", "Selection Error")
+            return
+        if self.is_read_only(folder_path):
+            return
 
         # Prompt user for the name of the file or directory
         name = Querybox.get_string("Enter the name for the new file or directory:", "Create Item")
@@ -257,6 +500,7 @@ class Home(Frame):
                 item_path.touch()  # Create a new file
             else:
                 item_path.mkdir()  # Create a new directory
+            self.record_created(item_path)
         except FileExistsError:
             Messagebox.show_error("The item already exists.", "Creation Error")
         except PermissionError:
@@ -269,85 +513,213 @@ class Home(Frame):
 
     def rename_item(self):
         # Get selected items from the right pane
-        selected_items = self.file_tree.selection()
+        selected_items = self.file_pane.selection()
         if not selected_items:
             Messagebox.show_error("Please select at least one file or directory to rename.", "Selection Error")
             return
+        if self.is_read_only(selected_items[0]):
+            return
 
-            # Prompt user for the new name
-        new_name = Querybox.get_string("Enter the new name for the selected items:", "Rename Item")
+        # Prompt user for the new name or a pattern
+        initial = self.file_pane.entry(selected_items[0]).name if len(selected_items) == 1 else ""
+        new_name = Querybox.get_string("Enter the new name for the selected items.\n"
+                                       "Patterns: {name}, {ext}, {n} or {n:03} for a counter, s/regex/replacement/.\n"
+                                       "The extension is kept unless the new name has its own.",
+                                       "Rename Item", initialvalue=initial)
 
         # Check if the user entered a name
         if not new_name:
             Messagebox.show_error("You must enter a new name.", "Input Error")
             return
+        try:
+            pattern = RenamePattern(new_name)
+        except RenamePatternError as e:
+            Messagebox.show_error(str(e), "Input Error")
+            return
 
-            # Rename each selected item
-        for index, item in enumerate(selected_items):
-            item_values = self.file_tree.item(item, "values")
-            item_path = Path(self.get_full_path(self.folder_tree.selection()[0])) / item_values[0]
-
-            # Determine the new name with a number if multiple items are selected
-            if len(selected_items) > 1:
-                new_item_name = f"{new_name} ({index + 1})"
+        # The whole batch is planned and checked first, then renamed through temporary names where needed
+        def on_success(result):
+            if result["conflicts"]:
+                self.show_error_report("rename", result["conflicts"])
+                self.status_label.config(text="Rename cancelled: nothing was renamed")
+                return
+            self.show_error_report("rename", result["errors"])
+            if result["rolled_back"]:
+                # Items were parked and put back; only a fresh read of their folders is certain to be right
+                for folder in {os.path.dirname(path) for path in selected_items}:
+                    self.listing_cache.invalidate(folder)
+                    self.disk_usage.invalidate(folder)
+            self.record_renamed(result["renamed"])
+            if result["rolled_back"]:
+                self.status_label.config(text="Rename failed: all items were restored")
             else:
-                new_item_name = new_name
-
-            new_item_path = item_path.parent / new_item_name
+                self.status_label.config(text=f"Renamed {len(result['renamed'])} items "
+                                              f"in {result['seconds'] * 1000:.0f} ms")
+            # Refresh the right pane to show the renamed items
+            self.on_folder_select(None)
 
-            try:
-                item_path.rename(new_item_path)  # Rename the item
-            except FileExistsError:
-                Messagebox.show_error(f"The item '{new_item_name}' already exists.", "Rename Error")
-            except PermissionError:
-                Messagebox.show_error(f"You do not have permission to rename '{item_values[0]}'.", "Permission Error")
-            except Exception as e:
-                Messagebox.show_error(f"An error occurred while renaming '{item_values[0]}': {str(e)}", "Error")
-
-                # Refresh the right pane to show the renamed items
-        self.on_folder_select(None)
+        self.jobs.start("Renaming", lambda token, progress: self.rename_engine.rename(
+            selected_items, pattern, token, progress), on_success)
 
     def delete_item(self):
         # Get selected items from the right pane
-        selected_items = self.file_tree.selection()
+        selected_items = self.file_pane.selection()
         if not selected_items:
             Messagebox.show_error("Please select at least one file or directory to delete.", "Selection Error")
             return
+        if self.is_read_only(selected_items[0]):
+            return
 
         # Confirmation dialog
         confirm = Messagebox.yesno("Are you sure you want to delete the selected items?", "Confirm Deletion")
         if not confirm:
             return  # User chose not to delete
 
-        # Delete each selected item
-        for item in selected_items:
-            item_values = self.file_tree.item(item, "values")
-            item_path = Path(self.get_full_path(self.folder_tree.selection()[0])) / item_values[0]
+        # Items are renamed into a hidden staging folder right away, then removed in the background
+        def on_staged(paths):
+            for path in paths:
+                self.record_deleted(path)
+            self.file_pane.remove(paths)
+            self.update_status_bar()
+
+        def on_success(result):
+            self.show_error_report("delete", result["errors"])
+            self.status_label.config(text=f"Deleted {result['deleted']} items")
+            # Refresh the right pane to show the updated items
+            self.on_folder_select(None)
 
-            try:
-                if item_path.is_dir():
-                    shutil.rmtree(item_path)  # Remove directory and all its contents
-                else:
-                    item_path.unlink()  # Remove file
-            except FileNotFoundError:
-                Messagebox.show_error(f"The item '{item_values[0]}' does not exist.", "Deletion Error")
-            except PermissionError:
-                Messagebox.show_error(f"You do not have permission to delete '{item_values[0]}'.", "Permission Error")
-            except OSError as e:
-                Messagebox.show_error(f"An error occurred while deleting '{item_values[0]}': {str(e)}", "Error")
-            except Exception as e:
-                Messagebox.show_error(f"An unexpected error occurred: {str(e)}", "Error")
-
-        # Refresh the right pane to show the updated items
-        self.on_folder_select(None)
+        def on_error(error):
+            Messagebox.show_error(f"An unexpected error occurred: {str(error)}", "Error")
+            self.on_folder_select(None)
+
+        self.jobs.start("Deleting", lambda token, progress: self.operations.delete(
+            selected_items, token, progress, lambda paths: self.ui_pump.post(on_staged, paths)), on_success, on_error)
+
+    def find_duplicates(self):
+        # Scan the subtree of the folder selected in the left pane
+        selected_item = self.folder_tree.selection()
+        folder_path = self.get_full_path(selected_item[0]) if selected_item else None
+        if folder_path is None or split_archive_path(folder_path) is not None:
+            Messagebox.show_error("Please select a valid folder in the left pane.", "Selection Error")
+            return
+
+        def on_success(result):
+            # Results replace the listing: one row per copy, grouped by duplicate set, biggest savings first
+            self.directory_lister.cancel()
+            self.search_engine.cancel()
+            self.content_search.cancel()
+            self.pane_folder = None
+            self.update_watches()
+            # A sort by any column would interleave the sets
+            self.file_pane.clear(full_path=True, keep_sort=False)
+            self.preview_pane.show(None)
+            self.file_pane.extend(*self.duplicate_finder.entries(result))
+            self.status_label.config(text=f"{len(result['groups'])} duplicate sets, "
+                                          f"{format_size(result['reclaimable'])} reclaimable | "
+                                          f"{result['files']} files, {result['hashed']} hashed, "
+                                          f"{result['cached']} from cache in {result['seconds']:.1f} s")
+
+        # Size buckets, then head/tail hashes, then full hashes, on a process pool
+        self.jobs.start("Finding duplicates", lambda token, progress: self.duplicate_finder.find(
+            folder_path, token, progress), on_success)
+
+    def copy_items(self):
+        self.set_clipboard("copy")
+
+    def cut_items(self):
+        self.set_clipboard("move")
+
+    def set_clipboard(self, mode):
+        selected_items = list(self.file_pane.selection())
+        if not selected_items:
+            Messagebox.show_warning("Please select files or directories first.", "No Selection")
+            return
+        if self.is_read_only(selected_items[0]):
+            return
+        self.clipboard = (mode, selected_items)
+        self.status_label.config(text=f"{len(selected_items)} items ready to {mode}")
+
+    def paste_items(self):
+        if self.clipboard is None:
+            Messagebox.show_warning("Copy or cut some items before pasting.", "Nothing to Paste")
+            return
+
+        # Paste into the folder selected in the left pane
+        selected_item = self.folder_tree.selection()
+        folder_path = self.get_full_path(selected_item[0]) if selected_item else None
+        if folder_path is None:
+            Messagebox.show_error("Please select a valid folder in the left pane.", "Selection Error")
+            return
+        if self.is_read_only(folder_path):
+            return
+
+        mode, items = self.clipboard
+        destination = str(folder_path)
+
+        # Ask once for the whole batch; Skip and Overwrite also finish an earlier, cancelled paste
+        policy = RENAME
+        conflicts = [item for item in self.transfer_engine.conflicts(items, destination)
+                     if os.path.dirname(item) != destination]
+        if conflicts:
+            answer = Messagebox.show_question(
+                f"{len(conflicts)} of the items already exist in '{folder_path.name or destination}'.",
+                "Items Already Exist", buttons=["Cancel:secondary", "Skip:secondary", "Overwrite:secondary",
+                                                "Keep Both:primary"])
+            if answer not in ("Skip", "Overwrite", "Keep Both"):
+                return
+            policy = {"Skip": SKIP, "Overwrite": OVERWRITE, "Keep Both": RENAME}[answer]
+
+        def on_success(result):
+            for path in result["items"]:
+                self.record_created(path)
+            if mode == "move":
+                for item in items:
+                    self.record_deleted(item)
+                self.clipboard = None
+            self.show_error_report(mode, result["errors"])
+            self.status_label.config(text=f"{'Moved' if mode == 'move' else 'Copied'} {len(result['items'])} items"
+                                          f" ({format_size(result['bytes'])}, {result['skipped']} files skipped)"
+                                          f" in {result['seconds']:.1f} s")
+            # Refresh the right pane to show the updated items
+            self.on_folder_select(None)
+
+        # Kernel-side copies on a worker pool; the status bar shows throughput and Cancel stops the job
+        transfer = self.transfer_engine.move if mode == "move" else self.transfer_engine.copy
+        self.jobs.start("Moving" if mode == "move" else "Copying",
+                        lambda token, progress: transfer(items, destination, policy, token, progress), on_success)
+
+    @staticmethod
+    def show_error_report(action, errors, limit=20):
+        # One summary dialog for all per-item failures of a batch operation
+        if not errors:
+            return
+        lines = [f"{os.path.basename(path) or path}: {message}" for path, message in errors[:limit]]
+        if len(errors) > limit:
+            lines.append(f"... and {len(errors) - limit} more")
+        Messagebox.show_error(f"Could not {action} {len(errors)} item(s):\n\n" + "\n".join(lines), "Errors")
 
     def on_folder_selection_change(self, _):
         # Clear search entry when selecting a new folder
         self.search_entry.delete(0, 'end')  # Clear the search entry
+        self.last_search_term = ""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+            self.search_job = None
         self.on_folder_select(None)  # Show files in the newly selected folder
 
     def search(self, _):
+        # Debounce keystrokes: only the last one in a burst starts a search
+        search_term = self.search_entry.get().strip()
+        if search_term == self.last_search_term:
+            return
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(settings.SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
         search_term = self.search_entry.get().strip()  # Get the search term and strip whitespace
+        self.last_search_term = search_term
 
         # Get selected folder from the left pane
         selected_item = self.folder_tree.selection()
@@ -356,11 +728,21 @@ class Home(Frame):
             return
 
         folder_path = self.get_full_path(selected_item[0])
+        if folder_path is None:
+            self.clear_search_results()
+            return
         self.display_search_results(folder_path, search_term)
 
+    @tracing.traced()
     def display_search_results(self, folder_path, search_term):
         # Clear previous results
-        self.clear_search_results()
+        self.directory_lister.cancel()
+        self.search_engine.cancel()
+        self.content_search.cancel()
+        self.pane_folder = None
+        # Matches come from many folders, so the Name column shows full paths
+        self.file_pane.clear(full_path=True)
+        self.preview_pane.show(None)
 
         # Convert folder_path to a Path object
         folder_path = Path(folder_path)
@@ -369,53 +751,111 @@ class Home(Frame):
             self.on_folder_select(None)
             return
 
-            # Determine if searching by extension or name
-        search_by_extension = search_term.startswith("*")
-        if search_by_extension:
-            ext = search_term[1:].lower()  # Get the extension without the asterisk
+        # Content search: files are scanned on a process pool and stream in with their hit counts
+        content_query = parse_query(search_term)
+        self.search_span.end(superseded=True)
+        self.search_span = tracing.begin("search", root=str(folder_path), term=search_term,
+                                         content=content_query is not None)
+        if content_query is not None:
+            self.search_started = time.perf_counter()
+            self.status_label.config(text="Searching file contents...")
+            self.content_search.search_async(folder_path, content_query, self.on_content_batch,
+                                             self.on_content_done)
+            return
+
+        # Answer from the filename index when it covers this folder, and refresh it in the background
+        indexed_root = self.filename_index.indexed_root(folder_path)
+        self.refresh_index(indexed_root or folder_path)
+
+        # Matches stream in on a worker thread; a newer keystroke cancels this search
+        self.search_started = time.perf_counter()
+        self.search_from_index = indexed_root is not None
+        self.status_label.config(text="Searching...")
+        self.search_engine.search_async(folder_path, search_term, self.on_search_batch, self.on_search_done,
+                                        use_index=self.search_from_index)
+
+    def on_search_batch(self, entries, scanned):
+        self.file_pane.extend(entries)
+        if self.search_from_index:
+            self.status_label.config(text=f"Searching... {len(self.file_pane)} matches")
         else:
-            ext = None
+            self.status_label.config(text=f"Searching... {len(self.file_pane)} matches ({scanned} items scanned)")
+
+    def on_search_done(self, found, scanned, capped):
+        self.search_span.end(found=found, scanned=scanned, indexed=self.search_from_index)
+        elapsed = (time.perf_counter() - self.search_started) * 1000
+        status_text = f"{found} matches in {elapsed:.0f} ms"
+        if capped:
+            status_text += f" (stopped at the limit of {settings.SEARCH_RESULT_CAP})"
+        if self.search_from_index:
+            status_text += f" | {self.describe_index()}"
+        else:
+            status_text += f" | {scanned} items scanned"
+        self.status_label.config(text=status_text)
 
-            # Search through the directory and its subdirectories
-        for item in folder_path.rglob('*'):
-            name = item.name
-            name_lower = name.lower()
+    def cancel_search(self, _=None):
+        # Escape stops a running search and keeps the matches found so far
+        self.search_engine.cancel()
+        self.content_search.cancel()
+        self.search_span.end(cancelled=True)
+        self.status_label.config(text=f"Search cancelled | {len(self.file_pane)} matches")
+
+    def on_content_batch(self, entries, labels, scanned):
+        self.file_pane.extend(entries, labels)
+        self.status_label.config(text=f"Searching file contents... {len(self.file_pane)} files match"
+                                      f" ({scanned} files scanned)")
+
+    def on_content_done(self, found, hits, scanned, capped):
+        self.search_span.end(found=found, hits=hits, scanned=scanned)
+        elapsed = (time.perf_counter() - self.search_started) * 1000
+        status_text = f"{hits} hits in {found} files in {elapsed:.0f} ms | {scanned} files scanned"
+        if capped:
+            status_text += f" (stopped at the limit of {settings.SEARCH_RESULT_CAP} files)"
+        self.status_label.config(text=status_text)
 
-            if search_by_extension:
-                # If searching for a specific extension
-                if name_lower.endswith(ext):
-                    self.add_file_to_tree(item)
-            else:
-                # If searching by name only
-                if search_term.lower() in name_lower:
-                    self.add_file_to_tree(item)
+    def refresh_index(self, root):
+        # Incremental re-index on a worker thread, at most one build at a time and once a minute per root
+        root = str(root)
+        if self.index_building or time.monotonic() - self.index_refreshed_at.get(root, -60) < 60:
+            return
+        self.index_building = True
+        self.index_refreshed_at[root] = time.monotonic()
+        threading.Thread(target=self.build_index, args=(root,), daemon=True).start()
 
-    def add_file_to_tree(self, item):
-        # Get file details
-        modified_time = time.strftime("%d/%m/%Y %I:%M %p", time.localtime(item.stat().st_mtime))
-        created_time = time.strftime("%d/%m/%Y %I:%M %p", time.localtime(item.stat().st_ctime))
-        size = self.format_size(item.stat().st_size)
-        file_type = item.suffix if item.is_file() else "Directory"
+    def build_index(self, root):
+        try:
+            build_seconds, entries = self.filename_index.update(root)
+        except Exception as e:
+            self.ui_pump.post(self.on_index_built, root, None, e)
+        else:
+            self.ui_pump.post(self.on_index_built, root, (build_seconds, entries), None)
 
-        # Insert file details into the tree
-        self.file_tree.insert('', 'end', text=item.name,
-                              values=(str(item), file_type, modified_time, created_time, size))
+    def on_index_built(self, root, result, error):
+        self.index_building = False
+        if error is not None:
+            self.status_label.config(text=f"Indexing {root} failed: {error}")
+        else:
+            self.status_label.config(text=f"Indexed {result[1]} names under {root} in {result[0]:.1f} s"
+                                          f" | {self.describe_index()}")
+
+    def describe_index(self):
+        stats = self.filename_index.stats()
+        build_seconds = sum(root["build_seconds"] for root in stats["roots"])
+        return f"index {format_size(stats['size_bytes'])}, last build {build_seconds:.1f} s"
 
     def clear_search_results(self):
         # Clear the right pane or reset it to show the original structure
-        self.file_tree.delete(*self.file_tree.get_children())  # Clear all items in the file tree
+        self.file_pane.clear()  # Clear all items in the file tree
+        self.preview_pane.show(None)
 
     def zip_files(self):
         # Get selected items from the tree view
-        selected_items = [item for item in self.file_tree.selection()]
+        selected_items = list(self.file_pane.selection())
 
         if not selected_items:
             Messagebox.show_warning("Please select files or directories to zip.", "No Selection")
             return
 
-        # Get the full path of the first selected item's parent directory
-        parent_directory = Path(self.file_tree.selection()[0]).parent
-
         # Ask for the zip file name
         zip_name = Querybox.get_string("Enter a name for the zip file (without extension):", "Zip File Name")
         if not zip_name:
@@ -424,82 +864,177 @@ class Home(Frame):
         # Ask for the password (optional)
         password = Querybox.get_string("Enter a password for the zip file (leave empty for no password):", "Password")
 
-        try:
-            # Create the zip file in the same directory where the selected items are located
-            zip_file_path = parent_directory / f"{zip_name}.zip"
-
-            if password:
-                with pyzipper.AESZipFile(zip_file_path, 'w', compression=pyzipper.ZIP_DEFLATED,
-                                         encryption=pyzipper.WZ_AES) as zf:
-                    zf.setpassword(password.encode('utf-8'))  # Set password if provided
-                    for item in selected_items:
-                        item_path = Path(item)
-                        if item_path.is_dir():
-                            for file_path in item_path.rglob('*'):
-                                if file_path.is_file():
-                                    zf.write(file_path, arcname=file_path.relative_to(parent_directory))
-                        else:
-                            zf.write(item_path, arcname=item_path.name)  # Write the files to the zip
-            else:
-                with pyzipper.AESZipFile(zip_file_path, 'w', compression=pyzipper.ZIP_DEFLATED) as zf:
-                    for item in selected_items:
-                        item_path = Path(item)
-                        if item_path.is_dir():
-                            for file_path in item_path.rglob('*'):
-                                if file_path.is_file():
-                                    zf.write(file_path, arcname=file_path.relative_to(parent_directory))
-                        else:
-                            zf.write(item_path, arcname=item_path.name)  # Write the files to the zip
-
-            Messagebox.show_info(f"Files successfully zipped to {zip_file_path.name}", "Success")
+        # Create the zip file in the same directory where the selected items are located
+        zip_file_path, parent_directory = zip_destination(selected_items, zip_name)
 
-        except Exception as e:
-            Messagebox.show_error(f"An error occurred while creating the zip file: {str(e)}", "Error")
+        def on_success(result):
+            self.record_created(zip_file_path)
+            Messagebox.show_info(f"Files successfully zipped to {os.path.basename(zip_file_path)}", "Success")
+            # Refresh the right pane to show the updated items
+            self.on_folder_select(None)
 
-        # Refresh the right pane to show the updated items
-        self.on_folder_select(None)
+        # Members are compressed in parallel on a worker pool; the status bar shows throughput
+        self.jobs.start("Zipping", lambda token, progress: self.operations.zip(
+            selected_items, zip_file_path, password, token, progress, parent_directory), on_success)
 
     def extract_zip(self):
         # Get selected zip file from the tree view
-        selected_item = self.file_tree.selection()
+        selected_item = self.file_pane.selection()
         if not selected_item or not selected_item[0].endswith('.zip'):
             Messagebox.show_warning("Please select a zip file to extract.", "No Selection")
             return
 
         zip_file_path = selected_item[0]
 
-        # Get the parent directory of the zip file
-        parent_directory = Path(self.file_tree.selection()[0]).parent
-
         # Ask for the extraction directory name
         extract_dir_name = Querybox.get_string("Enter a name for the extraction folder:", "Extract Directory Name")
         if not extract_dir_name:
             return  # Cancel if no name is provided
 
-        try:
-            # Create the extraction directory within the parent directory
-            extract_path = parent_directory / extract_dir_name
-            extract_path.mkdir(exist_ok=True)  # Create directory
-
-            with pyzipper.AESZipFile(zip_file_path) as zf:
-                try:
-                    # Attempt to extract without a password first
-                    zf.extractall(path=extract_path)
-                except RuntimeError:
-                    # If extraction fails, prompt for a password
-                    password = Querybox.get_string("Enter the zip file password:", "Zip Password")
-                    if password:
-                        zf.setpassword(password.encode('utf-8'))
-                        zf.extractall(path=extract_path)
+        # Create the extraction directory within the parent directory
+        extract_path = extract_destination(zip_file_path, extract_dir_name)
 
+        def on_success(_):
+            self.record_created(extract_path)
             Messagebox.show_info(f"Files successfully extracted to {extract_path}", "Success")
+            # Refresh the right pane to show the updated items
+            self.on_folder_select(None)
 
-        except Exception as e:
-            Messagebox.show_error(f"An error occurred while extracting the zip file: {str(e)}", "Error")
+        def on_error(error):
+            Messagebox.show_error(f"An error occurred while extracting the zip file: {str(error)}", "Error")
+            self.on_folder_select(None)
 
-        # Refresh the right pane to show the updated items
-        self.on_folder_select(None)
+        def extract(archive_info, password):
+            self.jobs.start("Extracting", lambda token, progress: self.operations.extract(
+                zip_file_path, extract_path, password, token, progress, archive_info), on_success, on_error)
+
+        def on_checked(archive_info):
+            if not archive_info.needs_password:
+                extract(archive_info, None)
+                return
+            password = Querybox.get_string("Enter the zip file password:", "Zip Password")
+            if not password:
+                return
+            # Test-decrypting a member reads the archive too, so it runs on a worker as well
+            self.jobs.start("Checking password", lambda token, progress: self.operations.check_password(
+                zip_file_path, archive_info, password), lambda _: extract(archive_info, password), on_check_error)
+
+        def on_check_error(error):
+            if isinstance(error, ZipSafetyError):
+                Messagebox.show_error(str(error), "Unsafe Archive")
+            elif isinstance(error, ZipPasswordError):
+                Messagebox.show_error(str(error), "Zip Password")
+            else:
+                Messagebox.show_error(f"An error occurred while reading the zip file: {str(error)}", "Error")
+
+        # Read the central directory once to learn whether a password is needed, before extracting anything;
+        # on a worker, since large archives and slow media take a while
+        self.jobs.start("Reading archive", lambda token, progress: self.operations.check_archive(zip_file_path),
+                        on_checked, on_check_error)
+
+    @staticmethod
+    def is_read_only(path):
+        # Archives are browsed, never modified in place
+        if split_archive_path(path) is not None and not is_archive(path):
+            Messagebox.show_error("Items inside a zip archive cannot be changed. Extract the archive first.",
+                                  "Read-only Archive")
+            return True
+        return False
+
+    def open_item(self, _):
+        item = self.file_tree.focus()
+        entry = self.file_pane.entry(item)
+        if entry is None:
+            return
+
+        # Folders (and archives browsed as folders) open in the panes; files in their default application
+        if entry.is_dir or is_archive(item):
+            self.reveal_folder(item)
+        elif split_archive_path(item) is not None:
+            self.open_archive_member(item)
+        else:
+            self.open_in_default_app(item)
+
+    def reveal_folder(self, path):
+        # Load the parent's children into the folder tree if needed, then select the folder
+        parent = os.path.dirname(path)
+        if not self.folder_tree.exists(path) and self.folder_tree.exists(parent):
+            self.folder_tree.delete(*self.folder_tree.get_children(parent))
+            self.insert_subfolders(parent, Path(parent))
+            self.folder_tree.item(parent, open=True)
+        if self.folder_tree.exists(path):
+            self.folder_tree.see(path)
+            self.folder_tree.selection_set(path)
+
+    def open_archive_member(self, path):
+        # Only this member is extracted, to a temp folder, and then opened
+        password = None
+        member = self.zip_browser.member(path)
+        if member is not None and member.flag_bits & 0x1:
+            password = Querybox.get_string("Enter the zip file password:", "Zip Password")
+            if not password:
+                return
+
+        def on_error(error):
+            Messagebox.show_error(f"An error occurred while opening '{os.path.basename(path)}': {str(error)}",
+                                  "Error")
+
+        self.jobs.start("Opening", lambda token, progress: self.zip_browser.extract_member(path, password),
+                        self.open_in_default_app, on_error)
+
+    @staticmethod
+    def open_in_default_app(path):
+        if os.name == "nt":
+            os.startfile(path)
+        elif sys.platform == "darwin":
+            subprocess.Popen(["open", path])
+        else:
+            subprocess.Popen(["xdg-open", path])
+
+    def set_busy(self, busy):
+        if busy:
+            self.cancel_button.grid()
+        else:
+            self.cancel_button.grid_remove()
+
+    def cancel_jobs(self):
+        self.jobs.cancel_all()
 
     def refresh_page(self):
         if self.folder_tree.selection():
+            # A folder's mtime does not move when a file inside it is rewritten, so Refresh always re-reads
+            folder_path = self.get_full_path(self.folder_tree.selection()[0])
+            if folder_path is not None:
+                self.listing_cache.invalidate(folder_path)
+            # Folder mtimes miss changes deeper down, so measured sizes start over as well
+            self.disk_usage.clear()
             self.on_folder_select(None)
+
+    def record_created(self, item_path):
+        # Patch the cached listing of the parent folder instead of re-reading the whole folder
+        item_path = str(item_path)
+        self.disk_usage.invalidate(os.path.dirname(item_path))
+        try:
+            entry = FileEntry.from_path(item_path)
+        except OSError:
+            self.listing_cache.invalidate(os.path.dirname(item_path))
+            return
+        self.listing_cache.add_entry(os.path.dirname(item_path), entry)
+
+    def record_renamed(self, renamed):
+        # One change per folder, so swapped names (a -> b, b -> a) drop the old entries before adding the new ones
+        by_folder = {}
+        for old_path, new_path in renamed:
+            by_folder.setdefault(os.path.dirname(new_path), []).append((old_path, new_path))
+        for folder, pairs in by_folder.items():
+            self.disk_usage.invalidate(folder)
+            try:
+                entries = [FileEntry.from_path(new_path) for _, new_path in pairs]
+            except OSError:
+                self.listing_cache.invalidate(folder)
+                continue
+            self.listing_cache.apply_changes(folder, entries, [old_path for old_path, _ in pairs])
+
+    def record_deleted(self, item_path):
+        self.disk_usage.invalidate(os.path.dirname(item_path))
+        self.listing_cache.remove_entry(os.path.dirname(item_path), item_path)
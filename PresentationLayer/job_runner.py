@@ -0,0 +1,79 @@
+from ttkbootstrap.dialogs import Messagebox
+import threading
+import time
+
+from CommonLayer import tracing
+from CommonLayer.cancel_token import CancelToken, OperationCancelled
+from CommonLayer.formatting import format_size
+
+
+class JobRunner:
+    # Runs long operations on worker threads and reports their progress to the status bar
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, post, set_status, set_busy):
+        self.post = post
+        self.set_status = set_status
+        self.set_busy = set_busy
+        self.tokens = set()
+
+    @property
+    def busy(self):
+        return bool(self.tokens)
+
+    def start(self, title, work, on_success, on_error=None):
+        # `work(token, progress)` runs on the worker; `on_success(result)` and `on_error(error)` on the UI thread
+        token = CancelToken()
+        self.tokens.add(token)
+        self.set_busy(True)
+        self.set_status(f"{title}...")
+        span = tracing.begin(title)
+        threading.Thread(target=self._run, args=(title, work, token, span, on_success, on_error), daemon=True).start()
+        return token
+
+    def cancel_all(self):
+        for token in self.tokens:
+            token.cancel()
+
+    def _run(self, title, work, token, span, on_success, on_error):
+        started = time.perf_counter()
+        reported_at = [0.0]
+
+        def progress(done, total, unit="bytes"):
+            now = time.perf_counter()
+            if now - reported_at[0] >= self.PROGRESS_INTERVAL or (total and done >= total):
+                reported_at[0] = now
+                self.post(self._report, title, done, total, unit, now - started)
+
+        try:
+            result = work(token, progress)
+        except OperationCancelled:
+            span.end(cancelled=True)
+            self.post(self._finish, token, lambda _: self.set_status(f"{title} cancelled"), None)
+        except Exception as e:
+            span.end(error=type(e).__name__)
+            self.post(self._finish, token, on_error or self._default_error(title), e)
+        else:
+            span.end()
+            self.post(self._finish, token, on_success, result)
+
+    def _report(self, title, done, total, unit, elapsed):
+        percent = f" ({done * 100 // total}%)" if total else ""
+        if unit == "bytes":
+            rate = format_size(int(done / elapsed)) if elapsed > 0 else "-"
+            self.set_status(f"{title}: {format_size(done)} of {format_size(total)}{percent} at {rate}/s")
+        else:
+            # Some jobs cannot know their total up front (total == 0)
+            rate = f"{done / elapsed:.0f}" if elapsed > 0 else "-"
+            counted = f"{done} of {total} {unit}" if total else f"{done} {unit}"
+            self.set_status(f"{title}: {counted}{percent} at {rate} {unit}/s")
+
+    def _finish(self, token, callback, value):
+        self.tokens.discard(token)
+        self.set_busy(self.busy)
+        callback(value)
+
+    def _default_error(self, title):
+        def show(error):
+            Messagebox.show_error(f"An error occurred while {title.lower()}: {str(error)}", "Error")
+        return show
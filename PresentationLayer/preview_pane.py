@@ -0,0 +1,89 @@
+from ttkbootstrap import Frame, Label, Text, Scrollbar
+import os
+
+from CommonLayer import settings
+from CommonLayer.formatting import format_size
+
+
+class PreviewPane(Frame):
+    # Shows the focused file; decoding happens in the preview engine's worker, Tk images are made here
+    def __init__(self, master, engine):
+        super().__init__(master)
+        self.engine = engine
+        self.path = None
+        self.pending_job = None
+        self.photo = None
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        self.title_label = Label(self, text="No file selected", anchor="w")
+        self.title_label.grid(row=0, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+
+        self.image_label = Label(self, anchor="center")
+        self.image_label.grid(row=1, column=0, columnspan=2, sticky="ew")
+
+        self.text = Text(self, wrap="none", width=40, state="disabled")
+        self.text.grid(row=2, column=0, sticky="nsew")
+
+        self.text_scrollbar = Scrollbar(self, orient="vertical", command=self.text.yview)
+        self.text_scrollbar.grid(row=2, column=1, sticky="ns")
+        self.text.config(yscrollcommand=self.text_scrollbar.set)
+
+    def show(self, path):
+        if path == self.path:
+            return
+        self.path = path
+        if self.pending_job is not None:
+            self.after_cancel(self.pending_job)
+            self.pending_job = None
+        if not path:
+            self.clear()
+            return
+
+        self.title_label.config(text=os.path.basename(path) or path)
+        # Arrow-key runs settle before anything is decoded; each new request also supersedes the previous one
+        self.pending_job = self.after(settings.PREVIEW_DEBOUNCE_MS, self.request, path)
+
+    def request(self, path):
+        self.pending_job = None
+        self.engine.preview_async(path, self.on_preview)
+
+    def clear(self):
+        self.engine.cancel()
+        self.path = None
+        self.title_label.config(text="No file selected")
+        self.set_image(None)
+        self.set_text("")
+
+    def on_preview(self, path, kind, value):
+        if path != self.path:
+            return
+        if kind == "image":
+            from PIL import Image, ImageTk
+
+            # PhotoImage must be created on the UI thread; the pixels were decoded on the worker
+            self.set_image(ImageTk.PhotoImage(Image.frombytes(value.mode, value.size, value.data)))
+            self.set_text("")
+        elif kind == "archive":
+            count, members = value
+            lines = [f"{format_size(size):>10}  {name}" for name, size in members]
+            if count > len(members):
+                lines.append(f"... and {count - len(members)} more")
+            self.set_image(None)
+            self.set_text(f"{count} items\n\n" + "\n".join(lines))
+        else:
+            # "text" shows the head of the file, "none" a short reason there is no preview
+            self.set_image(None)
+            self.set_text(value)
+
+    def set_image(self, photo):
+        # Keep a reference, or Tk drops the image as soon as Python collects it
+        self.photo = photo
+        self.image_label.config(image=photo or "")
+
+    def set_text(self, text):
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", text)
+        self.text.config(state="disabled")
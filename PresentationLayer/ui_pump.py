@@ -0,0 +1,29 @@
+import queue
+import time
+
+
+class UiPump:
+    # Worker threads never touch Tk directly; they post callbacks here and the UI thread drains them
+    INTERVAL_MS = 15
+    TIME_SLICE = 0.03
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.queue = queue.SimpleQueue()
+        self.widget.after(self.INTERVAL_MS, self._drain)
+
+    def post(self, callback, *args):
+        self.queue.put((callback, args))
+
+    def _drain(self):
+        # Run queued callbacks for at most one time slice so input events keep flowing
+        deadline = time.perf_counter() + self.TIME_SLICE
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    callback, args = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                callback(*args)
+        finally:
+            self.widget.after(self.INTERVAL_MS, self._drain)
@@ -0,0 +1,270 @@
+from ttkbootstrap import Style
+
+from CommonLayer.listing_model import ListingModel, COLUMNS
+
+
+class VirtualFilePane:
+    # Only the rows inside the viewport exist in the Treeview; the full listing lives in `model`
+    DEFAULT_ROW_HEIGHT = 20
+    WHEEL_ROWS = 3
+
+    def __init__(self, tree, scrollbar, on_select=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.on_select = on_select
+        self.style = Style()
+
+        self.model = ListingModel()
+        self.selected = set()
+        # Running totals over `selected`, adjusted on every selection delta
+        self.selected_bytes = 0
+        self.selected_folders = 0
+        self.rendered = []
+        self.top = 0
+        self.anchor = None
+
+        # The scrollbar reflects the whole model, not the handful of rows the Treeview holds
+        self.tree.config(yscrollcommand="")
+        self.scrollbar.config(command=self.on_scrollbar)
+
+        # Clicking a heading sorts the model; clicking it again reverses the order
+        for column in COLUMNS:
+            self.tree.heading(column, command=lambda column=column: self.sort_by(column))
+
+        self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        self.tree.bind("<ButtonPress-1>", self.on_click)
+        self.tree.bind("<Configure>", lambda _: self.render())
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda _: self.scroll_by(-self.WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda _: self.scroll_by(self.WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda event: self.move_focus(-1, event))
+        self.tree.bind("<Down>", lambda event: self.move_focus(1, event))
+        self.tree.bind("<Prior>", lambda event: self.move_focus(-self.visible_count(), event))
+        self.tree.bind("<Next>", lambda event: self.move_focus(self.visible_count(), event))
+        self.tree.bind("<Home>", lambda event: self.move_focus(-len(self.model), event))
+        self.tree.bind("<End>", lambda event: self.move_focus(len(self.model), event))
+
+    def __len__(self):
+        return len(self.model)
+
+    def clear(self, full_path=False, keep_sort=True):
+        # The sort order carries over to the next listing, unless the rows come in an order of their own
+        model = ListingModel(full_path)
+        if keep_sort:
+            model.sort_column, model.descending = self.model.sort_column, self.model.descending
+        else:
+            for name in COLUMNS:
+                self.tree.heading(name, text=name)
+        self.model = model
+        self.clear_selection()
+        self.top = 0
+        self.anchor = None
+        self.render()
+
+    def extend(self, entries, labels=None):
+        first = self.model.extend(entries, labels)
+        if first is None:
+            return
+
+        # Rows that land below a full viewport only move the scrollbar
+        if first >= self.top + self.visible_count():
+            self.update_scrollbar()
+        else:
+            self.render()
+
+    def remove(self, paths):
+        self.deselect(paths)
+        if self.model.remove(paths) is None:
+            return
+        self.render()
+
+    def upsert(self, entries):
+        # Changed rows are updated in place and new rows inserted at their sorted position
+        if not entries:
+            return
+        rendered = set(self.rendered)
+        for entry in entries:
+            selected = entry.path in self.selected
+            if selected:
+                self.count(entry.path, -1)
+            position, _ = self.model.upsert(entry)
+            if selected:
+                self.count(entry.path, 1)
+            if entry.path in rendered:
+                self.tree.item(entry.path, values=self.model.values_at(position))
+        self.render()
+
+    def set_sizes(self, sizes):
+        # Recursive folder sizes arrive one subtree at a time; only rows in view are redrawn
+        rendered = set(self.rendered)
+        for path, size in sizes:
+            position = self.model.set_size(path, size)
+            if position is not None and path in rendered:
+                self.tree.item(path, values=self.model.values_at(position))
+        self.render()
+
+    def entry(self, path):
+        return self.model.entry(path)
+
+    def selection(self):
+        return tuple(sorted(self.selected, key=self.model.positions.__getitem__))
+
+    def selection_summary(self):
+        # (count, total bytes of selected files, True when no folder is selected), without touching the disk
+        return len(self.selected), self.selected_bytes, self.selected_folders == 0
+
+    def count(self, path, sign):
+        model = self.model
+        row = model.rows[path]
+        if model.is_dir[row]:
+            self.selected_folders += sign
+        else:
+            self.selected_bytes += sign * model.sizes[row]
+
+    def select(self, paths):
+        for path in paths:
+            if path not in self.selected and path in self.model:
+                self.selected.add(path)
+                self.count(path, 1)
+
+    def deselect(self, paths):
+        for path in paths:
+            if path in self.selected:
+                self.selected.discard(path)
+                self.count(path, -1)
+
+    def clear_selection(self):
+        self.selected = set()
+        self.selected_bytes = 0
+        self.selected_folders = 0
+
+    def replace_selection(self, paths):
+        # Only the difference between the old and the new selection is counted
+        paths = set(paths)
+        self.deselect(self.selected - paths)
+        self.select(paths - self.selected)
+
+    def sort_by(self, column, descending=None):
+        model = self.model
+        if descending is None:
+            descending = not model.descending if model.sort_column == column else False
+        model.sort(column, descending)
+        for name in COLUMNS:
+            arrow = (" \u25bc" if descending else " \u25b2") if name == column else ""
+            self.tree.heading(name, text=name + arrow)
+        self.render(force_selection=True)
+
+    def visible_count(self):
+        # Rows that fit below the heading line
+        height = self.tree.winfo_height()
+        return max(1, height // self.row_height() - 1)
+
+    def row_height(self):
+        try:
+            return int(self.style.lookup("Treeview", "rowheight")) or self.DEFAULT_ROW_HEIGHT
+        except (TypeError, ValueError):
+            return self.DEFAULT_ROW_HEIGHT
+
+    def render(self, force_selection=False):
+        visible = self.visible_count()
+        model = self.model
+        self.top = max(0, min(self.top, len(model) - visible))
+        positions = range(self.top, min(len(model), self.top + visible))
+
+        paths = [model.path_at(position) for position in positions]
+        changed = paths != self.rendered
+        if changed:
+            # Only rows that enter or leave the viewport touch Tk; the rest are moved into place
+            focus = self.tree.focus()
+            keep = set(paths)
+            stale = [path for path in self.rendered if path not in keep]
+            if stale:
+                self.tree.delete(*stale)
+            present = set(self.rendered).difference(stale)
+            for row, path in enumerate(paths):
+                if path in present:
+                    self.tree.move(path, "", row)
+                else:
+                    # Display strings are only ever built here, for rows entering the viewport
+                    self.tree.insert("", row, iid=path, values=model.values_at(self.top + row))
+            self.rendered = paths
+            if focus in keep:
+                self.tree.focus(focus)
+
+        if changed or force_selection:
+            self.tree.selection_set([path for path in self.rendered if path in self.selected])
+
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = len(self.model)
+        if total == 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_count()) / total))
+
+    def scroll_to(self, top):
+        self.top = top
+        self.render()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.top + rows)
+        return "break"
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.model)))
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.visible_count())
+        else:
+            self.scroll_by(int(amount))
+
+    def on_mouse_wheel(self, event):
+        return self.scroll_by(-self.WHEEL_ROWS if event.delta > 0 else self.WHEEL_ROWS)
+
+    def on_click(self, event):
+        # A plain click on a row replaces the selection, including rows scrolled out of view; headings and the
+        # scrollbar gap leave it alone
+        if self.tree.identify_region(event.x, event.y) not in ("cell", "tree"):
+            return
+        if not event.state & (0x0001 | 0x0004):
+            self.clear_selection()
+
+    def on_tree_select(self, _):
+        # Fold the visible selection into the model; rows outside the viewport keep their state
+        shown = set(self.tree.selection())
+        self.deselect([path for path in self.rendered if path not in shown])
+        self.select(shown)
+        if self.on_select:
+            self.on_select()
+
+    def move_focus(self, delta, event):
+        model = self.model
+        if not len(model):
+            return "break"
+
+        current = model.position(self.tree.focus())
+        position = max(0, min(len(model) - 1, (self.top if current is None else current) + delta))
+        path = model.path_at(position)
+
+        # Shift extends the selection from the anchor, otherwise the focused row becomes the selection
+        anchor = model.position(self.anchor)
+        if event.state & 0x0001 and anchor is not None:
+            start, end = sorted((anchor, position))
+            self.replace_selection(model.path_at(index) for index in range(start, end + 1))
+        else:
+            self.replace_selection((path,))
+            self.anchor = path
+
+        visible = self.visible_count()
+        if position < self.top:
+            self.top = position
+        elif position >= self.top + visible:
+            self.top = position - visible + 1
+
+        self.render(force_selection=True)
+        self.tree.focus(path)
+        self.tree.see(path)
+        if self.on_select:
+            self.on_select()
+        return "break"
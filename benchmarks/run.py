@@ -0,0 +1,282 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BusinessLogicLayer.file_operations import FileOperations  # noqa: E402
+from benchmarks.synthetic_trees import TREES, NEEDLE, generate  # noqa: E402
+
+
+def read_io():
+    # Read/write syscall and byte counters of this process (Linux); pool workers are not included.
+    # stat, getdents and open are not counted, so listing and search show almost none here.
+    try:
+        with open("/proc/self/io", encoding="ascii") as counters:
+            return {key: int(value) for key, value in (line.split(":") for line in counters)}
+    except OSError:
+        return None
+
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM, so each run reports its own peak rather than the process's
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes():
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # Process lifetime peak; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def cpu_seconds():
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {"user": own.ru_utime, "system": own.ru_stime,
+            "children_user": children.ru_utime, "children_system": children.ru_stime}
+
+
+def measure(run, context):
+    # One timed run: wall time, read/write syscalls and bytes, CPU (including pool workers that have exited), peak RSS
+    peak_reset = reset_peak_rss()
+    io_before = read_io()
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    detail = run(context)
+    seconds = time.perf_counter() - started
+    io_after = read_io()
+    cpu_after = cpu_seconds()
+
+    sample = {"seconds": round(seconds, 6), "detail": detail}
+    if io_before is not None and io_after is not None:
+        io = {key: io_after[key] - io_before[key] for key in io_after}
+        sample["read_write_syscalls"] = {"read": io.pop("syscr", None), "write": io.pop("syscw", None)}
+        sample["io_bytes"] = io
+    if cpu_before is not None:
+        sample["cpu_seconds"] = {key: round(cpu_after[key] - cpu_before[key], 6) for key in cpu_after}
+    sample["peak_rss_bytes"] = peak_rss_bytes()
+    sample["peak_rss_scope"] = "run" if peak_reset else "process"
+    return sample
+
+
+class Case:
+    # setup(trees, scratch) -> context, untimed; run(context) -> details, timed; teardown(context), untimed
+    def __init__(self, name, operation, tree, run, setup=None, teardown=None):
+        self.name = name
+        self.operation = operation
+        self.tree = tree
+        self.run = run
+        self.setup = setup or (lambda trees, scratch: trees[tree])
+        self.teardown = teardown or (lambda context: None)
+
+
+def build_cases(operations):
+    def list_tree(root):
+        # What on_folder_select does for every folder of the tree
+        items = 0
+        folders = 0
+        for folder, _, _ in os.walk(root):
+            items += sum(1 for _ in operations.list_folder(folder))
+            folders += 1
+        return {"items": items, "folders": folders}
+
+    def search(term):
+        def run(root):
+            summary = operations.search(root, term, lambda entries, labels: None, limit=sys.maxsize)
+            return {"found": summary["found"], "scanned": summary["scanned"]}
+        return run
+
+    def zip_setup(tree):
+        def setup(trees, scratch):
+            return trees[tree], os.path.join(scratch, f"{tree}.zip")
+        return setup
+
+    def zip_run(context):
+        root, zip_path = context
+        result = operations.zip([os.path.join(root, name) for name in sorted(os.listdir(root))], zip_path,
+                                base_dir=root)
+        return {"members": result["members"], "bytes_in": result["bytes_in"], "bytes_out": result["bytes_out"]}
+
+    def extract_setup(tree):
+        def setup(trees, scratch):
+            zip_path = os.path.join(scratch, f"{tree}-source.zip")
+            if not os.path.exists(zip_path):
+                operations.zip([os.path.join(trees[tree], name) for name in sorted(os.listdir(trees[tree]))],
+                               zip_path, base_dir=trees[tree])
+            return zip_path, os.path.join(scratch, f"{tree}-extracted")
+        return setup
+
+    def extract_run(context):
+        zip_path, destination = context
+        result = operations.extract(zip_path, destination)
+        return {"members": result["members"], "bytes": result["bytes"]}
+
+    def delete_setup(tree):
+        def setup(trees, scratch):
+            # A fresh copy per run, made outside the timed section
+            copy = os.path.join(scratch, f"{tree}-to-delete")
+            shutil.copytree(trees[tree], copy)
+            return copy
+        return setup
+
+    def delete_run(root):
+        result = operations.delete([os.path.join(root, name) for name in os.listdir(root)])
+        os.rmdir(root)
+        return {"deleted": result["deleted"], "errors": len(result["errors"])}
+
+    def remove(context):
+        for path in context[1:] if isinstance(context, tuple) else ():
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    cases = []
+    for tree in ("many_small", "deep_nesting", "huge_folder"):
+        cases.append(Case(f"list/{tree}", "on_folder_select", tree, list_tree))
+    for tree in ("many_small", "deep_nesting", "huge_folder"):
+        cases.append(Case(f"search_name/{tree}", "display_search_results", tree, search("7")))
+    cases.append(Case("search_content/many_small", "display_search_results", "many_small",
+                      search(f"content: {NEEDLE}")))
+    for tree in ("many_small", "large_binaries"):
+        cases.append(Case(f"zip/{tree}", "zip_files", tree, zip_run, zip_setup(tree), remove))
+        cases.append(Case(f"extract/{tree}", "extract_zip", tree, extract_run, extract_setup(tree), remove))
+    for tree in ("many_small", "huge_folder"):
+        cases.append(Case(f"delete/{tree}", "delete_item", tree, delete_run, delete_setup(tree)))
+    return cases
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline_path):
+    # Ratio of median times against an earlier report; below 1.0 is faster
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = {case["case"]: case for case in json.load(baseline_file)["results"]}
+    comparison = []
+    for case in results:
+        before = baseline.get(case["case"])
+        if before is None or "seconds_median" not in before or "seconds_median" not in case:
+            continue
+        comparison.append({"case": case["case"], "before": before["seconds_median"], "after": case["seconds_median"],
+                           "ratio": round(case["seconds_median"] / before["seconds_median"], 3)
+                           if before["seconds_median"] else None})
+    return comparison
+
+
+def run_benchmarks(root, scale, repeat, patterns, log):
+    operations = FileOperations()
+    cases = [case for case in build_cases(operations)
+             if not patterns or any(fnmatch.fnmatch(case.name, pattern) for pattern in patterns)]
+
+    trees = {}
+    files = {}
+    for name in sorted({case.tree for case in cases}):
+        trees[name] = os.path.join(root, "trees", name)
+        if not os.path.isdir(trees[name]):
+            log(f"generating {name}")
+            files[name] = generate(name, trees[name], scale)
+        else:
+            files[name] = sum(len(names) for _, _, names in os.walk(trees[name]))
+    scratch = os.path.join(root, "scratch")
+    os.makedirs(scratch, exist_ok=True)
+
+    results = []
+    for case in cases:
+        log(f"running {case.name}")
+        report = {"case": case.name, "operation": case.operation, "tree": case.tree, "files": files[case.tree]}
+        samples = []
+        try:
+            for _ in range(repeat):
+                context = case.setup(trees, scratch)
+                try:
+                    samples.append(measure(case.run, context))
+                finally:
+                    case.teardown(context)
+        except Exception as e:
+            # Missing optional dependencies (pyzipper for extract) skip the case instead of the whole suite
+            report["error"] = f"{type(e).__name__}: {e}"
+        if samples:
+            times = [sample["seconds"] for sample in samples]
+            report.update({"seconds_median": statistics.median(times), "seconds_min": min(times),
+                           "seconds": times, "last_run": samples[-1]})
+        results.append(report)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the listing, search, zip, extract and delete data paths "
+                                                 "on synthetic trees and report the results as JSON.")
+    parser.add_argument("cases", nargs="*", help="glob patterns of case names, e.g. 'zip/*' (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="tree size factor (default 1.0)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (default 3)")
+    parser.add_argument("--root", help="folder for the trees; kept and reused between runs (default: temporary)")
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    parser.add_argument("--compare", help="an earlier report to compare median times against")
+    arguments = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    root = arguments.root or tempfile.mkdtemp(prefix="fileexplorer-bench-")
+    try:
+        results = run_benchmarks(root, arguments.scale, max(1, arguments.repeat), arguments.cases, log)
+    finally:
+        if arguments.root is None:
+            shutil.rmtree(root, ignore_errors=True)
+        else:
+            shutil.rmtree(os.path.join(root, "scratch"), ignore_errors=True)
+
+    report = {"meta": {"revision": git_revision(), "python": platform.python_version(),
+                       "platform": platform.platform(), "cpu_count": os.cpu_count(), "scale": arguments.scale,
+                       "repeat": arguments.repeat, "trees": sorted(TREES), "at": time.time()},
+              "results": results}
+    if arguments.compare:
+        report["comparison"] = compare(results, arguments.compare)
+
+    text = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
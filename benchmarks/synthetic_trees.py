@@ -0,0 +1,90 @@
+import os
+import random
+
+# Every tree is generated from a fixed seed, so two runs at the same scale measure the same files
+SEED = 1234
+WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet", "kilo", "lima")
+# Every NEEDLE_EVERY-th small file contains this word, for content search
+NEEDLE = "needle"
+NEEDLE_EVERY = 97
+BLOCK_BYTES = 1024 * 1024
+
+
+def text_block(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words).encode("ascii")[:size]
+
+
+def many_small(root, scale=1.0):
+    # Source trees: 100 folders of small text files, 0-4 KB each
+    rng = random.Random(SEED)
+    corpus = text_block(rng, 64 * 1024)
+    count = 0
+    for folder_number in range(100):
+        folder = os.path.join(root, f"folder{folder_number:03d}")
+        os.makedirs(folder, exist_ok=True)
+        for file_number in range(max(1, int(200 * scale))):
+            size = rng.randrange(4096)
+            offset = rng.randrange(len(corpus) - size)
+            data = corpus[offset:offset + size]
+            if count % NEEDLE_EVERY == 0:
+                data += b"\n" + NEEDLE.encode("ascii") + b"\n"
+            with open(os.path.join(folder, f"file{file_number:05d}.txt"), "wb") as out:
+                out.write(data)
+            count += 1
+    return count
+
+
+def deep_nesting(root, scale=1.0):
+    # One long chain of folders with a few files at every level
+    folder = root
+    count = 0
+    for depth in range(max(1, int(200 * scale))):
+        folder = os.path.join(folder, f"d{depth:03d}")
+        os.makedirs(folder, exist_ok=True)
+        for file_number in range(5):
+            with open(os.path.join(folder, f"level{depth:03d}_{file_number}.txt"), "wb") as out:
+                out.write(b"x" * file_number)
+            count += 1
+    return count
+
+
+def huge_folder(root, scale=1.0):
+    # A single folder with tens of thousands of tiny files
+    os.makedirs(root, exist_ok=True)
+    count = max(1, int(50000 * scale))
+    for file_number in range(count):
+        with open(os.path.join(root, f"item{file_number:06d}.dat"), "wb") as out:
+            out.write(b"%d" % file_number)
+    return count
+
+
+def large_binaries(root, scale=1.0):
+    # A few large incompressible files; each 1 MB block differs so deflate finds no repeats
+    rng = random.Random(SEED)
+    os.makedirs(root, exist_ok=True)
+    block = rng.randbytes(BLOCK_BYTES)
+    blocks = max(1, int(64 * scale))
+    for file_number in range(4):
+        with open(os.path.join(root, f"blob{file_number}.bin"), "wb") as out:
+            for block_number in range(blocks):
+                out.write((block_number * 4 + file_number).to_bytes(8, "little") + block[8:])
+    return 4
+
+
+TREES = {
+    "many_small": many_small,
+    "deep_nesting": deep_nesting,
+    "huge_folder": huge_folder,
+    "large_binaries": large_binaries,
+}
+
+
+def generate(name, root, scale=1.0):
+    # Returns the number of files written
+    return TREES[name](root, scale)
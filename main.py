@@ -1,4 +1,13 @@
-from PresentationLayer.main_view import MainView
+from CommonLayer import startup_timer  # noqa: F401  (starts the cold-start clock before anything else loads)
+import sys
 
 if __name__ == '__main__':
+    if "--batch" in sys.argv[1:]:
+        # Headless mode: no Tk, ttkbootstrap or psutil, and each command imports only the engines it uses
+        from PresentationLayer.batch_cli import main as batch_main
+
+        sys.exit(batch_main([arg for arg in sys.argv[1:] if arg != "--batch"]))
+
+    from PresentationLayer.main_view import MainView
+
     main = MainView()